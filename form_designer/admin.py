@@ -1,18 +1,31 @@
+import csv
+import itertools
+import sys
+import tempfile
 import warnings
 
 from admin_ordering.admin import OrderableAdmin
 from django import forms
 from django.contrib import admin, messages
-from django.db.models import Model
+from django.contrib.admin import widgets
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Exists, Model, OuterRef, Prefetch, TextField
 from django.forms.models import modelform_factory
-from django.http import HttpResponseRedirect
+from django.http import FileResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
 from django.urls import re_path
+from django.utils.formats import date_format
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
 from django.utils.text import capfirst, slugify
+from django.utils.timezone import template_localtime
 from django.utils.translation import gettext_lazy as _
 from xlsxdocument import XLSXDocument
 
-from form_designer import models
+from form_designer import exports, models
 
 
 def jsonize(v):
@@ -25,6 +38,13 @@ def jsonize(v):
     return v
 
 
+class _Echo:
+    """File-like object which returns written values instead of buffering them"""
+
+    def write(self, value):
+        return value
+
+
 class FormAdminForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -70,6 +90,7 @@ class FormAdminForm(forms.ModelForm):
         data = super().clean()
 
         if "config" in self.changed_data:
+            self._check_requirements(data.get("config") or {})
             return data
 
         selected = [
@@ -91,8 +112,23 @@ class FormAdminForm(forms.ModelForm):
             config[s] = option_item
 
         data["config"] = jsonize(config)
+        self._check_requirements(config)
         return data
 
+    def _check_requirements(self, config):
+        options = dict(self._meta.model.CONFIG_OPTIONS)
+        for key in config:
+            for required in options.get(key, {}).get("requires", ()):
+                if required not in config:
+                    self.add_error(
+                        None,
+                        _("%(option)s requires %(required)s.")
+                        % {
+                            "option": options[key].get("title", key),
+                            "required": options[required].get("title", required),
+                        },
+                    )
+
     def _form_fields(self, cfg_key, cfg):
         form_fields = cfg.get("form_fields")
         if not form_fields:
@@ -113,6 +149,7 @@ class FormFieldAdmin(OrderableAdmin, admin.TabularInline):
     prepopulated_fields = {"name": ["title"]}
     fk_name = "form"
     ordering_field = "ordering"
+    formfield_overrides = {TextField: {"widget": widgets.AdminTextInputWidget}}
 
 
 class FormAdmin(admin.ModelAdmin):
@@ -120,7 +157,9 @@ class FormAdmin(admin.ModelAdmin):
     inlines = [FormFieldAdmin]
     list_display = ["title"]
     ordering = ["title"]
+    readonly_fields = ["data_keys_overview"]
     save_as = True
+    export_chunk_size = 2000
 
     class Media:
         css = {"all": ["form_designer/admin.css"]}
@@ -128,6 +167,10 @@ class FormAdmin(admin.ModelAdmin):
     def get_form(self, request, obj=None, **kwargs):
         return modelform_factory(self.model, form=self.form, fields="__all__")
 
+    def render_change_form(self, request, context, **kwargs):
+        context["columnar_exports"] = exports.is_available()
+        return super().render_change_form(request, context, **kwargs)
+
     def _form_fields(self, cfg_key, cfg):
         form_fields = cfg.get("form_fields")
         if not form_fields:
@@ -165,50 +208,345 @@ class FormAdmin(admin.ModelAdmin):
         fieldsets.append(
             (_("Configuration"), {"fields": ["config"], "classes": ["collapse"]}),
         )
+        if obj is not None:
+            fieldsets.append(
+                (
+                    _("Submitted data"),
+                    {"fields": ["data_keys_overview"], "classes": ["collapse"]},
+                ),
+            )
         return fieldsets
 
+    @admin.display(description=_("data keys"))
+    def data_keys_overview(self, obj):
+        data_keys = obj.data_keys.annotate(
+            is_current=Exists(
+                models.FormField.objects.filter(
+                    form=OuterRef("form"), name=OuterRef("key")
+                )
+            )
+        )
+        return format_html(
+            "<table><tr><th>{}</th><th>{}</th><th>{}</th></tr>{}</table>",
+            _("key"),
+            _("first seen at"),
+            _("last seen at"),
+            format_html_join(
+                "",
+                "<tr><td>{}</td><td>{}</td><td>{}</td></tr>",
+                (
+                    (
+                        key.key
+                        if key.is_current
+                        else "{} ({})".format(key.key, _("removed field")),
+                        date_format(
+                            template_localtime(key.first_seen_at), "DATETIME_FORMAT"
+                        ),
+                        date_format(
+                            template_localtime(key.last_seen_at), "DATETIME_FORMAT"
+                        ),
+                    )
+                    for key in data_keys
+                ),
+            ),
+        )
+
     def export_submissions(self, request, form_id):
         form = get_object_or_404(models.Form, pk=form_id)
-        submissions = form.submissions.all()
+        include_archived = bool(request.GET.get("archived"))
+        submissions = next_cursor = None
 
-        if not submissions:
+        if {"new", "cursor", "since"} & set(request.GET):
+            try:
+                submissions, next_cursor = self._new_submissions(request, form)
+            except ValueError as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+                return HttpResponseRedirect("../change/")
+            if not submissions.exists():
+                self.message_user(request, _("No new submissions."), messages.WARNING)
+                return HttpResponseRedirect("../change/")
+            # Archives only contain old submissions
+            include_archived = False
+
+        elif not form.submissions.exists() and not (
+            include_archived and form.archives.exists()
+        ):
             self.message_user(request, _("No submissions yet."), messages.WARNING)
             return HttpResponseRedirect("../change/")
 
-        sd = form.submissions_data(submissions=submissions)
+        if (export_format := request.GET.get("format")) in exports.FORMATS:
+            if not exports.is_available():
+                self.message_user(
+                    request,
+                    _("Columnar exports require pyarrow."),
+                    messages.ERROR,
+                )
+                return HttpResponseRedirect("../change/")
+            extension, content_type = exports.FORMATS[export_format]
+            # Closed by the FileResponse once it has been sent
+            file = tempfile.TemporaryFile()  # noqa: SIM115
+            exports.write_submissions(
+                form,
+                file,
+                format=export_format,
+                submissions=submissions,
+                include_archived=include_archived,
+                row_group_size=self.export_chunk_size,
+            )
+            file.seek(0)
+            response = FileResponse(
+                file,
+                as_attachment=True,
+                filename=f"{slugify(form.title)}.{extension}",
+                content_type=content_type,
+            )
+        else:
+            rows = self._export_rows(
+                form, submissions=submissions, include_archived=include_archived
+            )
+            response = self._export_response(request, form, rows)
+        if next_cursor:
+            response["X-Export-Cursor"] = next_cursor
+            if "new" in request.GET:
+                response = self._advance_marker_when_sent(
+                    response, form=form, user=request.user, cursor=next_cursor
+                )
+        return response
+
+    def _advance_marker_when_sent(self, response, *, form, user, cursor):
+        """
+        Return a streaming response which stores ``cursor`` as the user's
+        export marker after the last chunk has been sent
+
+        Downloads which fail or are aborted midway are therefore exported
+        again by the next ``?new=1`` export.
+        """
+
+        def advance():
+            models.ExportMarker.objects.update_or_create(
+                form=form, user=user, defaults={"cursor": cursor}
+            )
+            yield b""
 
-        rows = [
-            [field["title"] for field in sd[0]["data"]] + [_("submitted at"), _("URL")],
-            [field["name"] for field in sd[0]["data"]],
-        ] + [
-            [field["value"] for field in submission["data"]]
-            + [submission["submission"].submitted_at, submission["submission"].url]
-            for submission in sd
-        ]
+        if response.streaming:
+            response.streaming_content = itertools.chain(
+                response.streaming_content, advance()
+            )
+            return response
+        streaming = StreamingHttpResponse(
+            itertools.chain([response.content], advance()),
+            status=response.status_code,
+        )
+        for header, value in response.items():
+            streaming[header] = value
+        return streaming
+
+    def _new_submissions(self, request, form):
+        """
+        Return the submissions of an incremental export and the cursor of the
+        last exported submission
+
+        ``?new=1`` exports the submissions made since the user's last export
+        using ``?new=1``, ``?cursor=`` those after a cursor returned in the
+        ``X-Export-Cursor`` header and ``?since=`` those made after a date or
+        datetime.
+        """
+        since = cursor = None
+        if "new" in request.GET:
+            marker = models.ExportMarker.objects.filter(
+                form=form, user=request.user
+            ).first()
+            cursor = marker.cursor if marker else None
+        else:
+            cursor = request.GET.get("cursor")
+            if value := request.GET.get("since"):
+                since = models.parse_since(value)
+
+        last = form.submissions.order_by("-submitted_at", "-id").first()
+        if last is None:
+            return form.submissions.none(), None
+        next_cursor = models.submission_cursor(last)
+        return (
+            form.submissions_after(cursor, since=since, until=next_cursor),
+            next_cursor,
+        )
+
+    def _export_response(self, request, form, rows):
+        if request.GET.get("format") == "csv":
+            writer = csv.writer(_Echo())
+            response = StreamingHttpResponse(
+                (writer.writerow(row) for row in rows),
+                content_type="text/csv; charset=utf-8",
+            )
+            response["Content-Disposition"] = 'attachment; filename="%s.csv"' % slugify(
+                form.title
+            )
+            return response
 
         xlsx = XLSXDocument()
         xlsx.add_sheet(slugify(form.title))
         xlsx.table([], rows)
         return xlsx.to_response("%s.xlsx" % slugify(form.title))
 
+    def _export_rows(self, form, *, submissions=None, include_archived=False):
+        sd = form.iter_submissions_data(
+            submissions=submissions,
+            chunk_size=self.export_chunk_size,
+            include_archived=include_archived,
+            all_keys=True,
+        )
+        if (first := next(sd, None)) is None:
+            return
+
+        yield [field["title"] for field in first["data"]] + [
+            _("submitted at"),
+            _("URL"),
+        ]
+        yield [field["name"] for field in first["data"]]
+        for submission in itertools.chain([first], sd):
+            yield [field["value"] for field in submission["data"]] + [
+                submission["submission"].submitted_at,
+                submission["submission"].url,
+            ]
+
+    def statistics_view(self, request, form_id):
+        form = get_object_or_404(models.Form, pk=form_id)
+        if not self.has_view_permission(request, form):
+            raise PermissionDenied
+        statistics = form.submission_statistics()
+        max_per_day = max((count for day, count in statistics["per_day"]), default=0)
+        return TemplateResponse(
+            request,
+            "admin/form_designer/form/statistics.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "original": form,
+                "title": _("Statistics of %s") % form,
+                "statistics": statistics,
+                "per_day": [
+                    (day, count, 100 * count / max_per_day)
+                    for day, count in statistics["per_day"]
+                ],
+            },
+        )
+
     def get_urls(self):
         return [
             re_path(
                 r"(?P<form_id>\d+)/export_submissions/",
                 self.admin_site.admin_view(self.export_submissions),
                 name="form_designer_formsubmission_export",
-            )
+            ),
+            re_path(
+                r"(?P<form_id>\d+)/statistics/",
+                self.admin_site.admin_view(self.statistics_view),
+                name="form_designer_form_statistics",
+            ),
         ] + super().get_urls()
 
 
+CURSOR_VAR = "cursor"
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginator fetching pages using ``paginate_submissions``
+
+    The page number is ignored, the position is determined by the cursor
+    instead. ``next_page_query`` contains the query string for the next page.
+    """
+
+    keyset = True
+
+    def __init__(self, object_list, per_page, *, request, cursor=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.request = request
+        self.cursor = cursor
+        self.next_page_query = None
+
+    @cached_property
+    def submissions(self):
+        submissions, next_cursor = models.paginate_submissions(
+            self.object_list, cursor=self.cursor, limit=self.per_page
+        )
+        if next_cursor:
+            query = self.request.GET.copy()
+            query[CURSOR_VAR] = next_cursor
+            self.next_page_query = query.urlencode()
+        return submissions
+
+    @cached_property
+    def count(self):
+        # Counting all submissions is too expensive. The changelist uses the
+        # count to decide whether to paginate at all (and whether showing all
+        # submissions is allowed), so report an unlimited number of
+        # submissions unless everything fits on the first page.
+        submissions = self.submissions
+        if self.cursor or self.next_page_query:
+            return sys.maxsize
+        return len(submissions)
+
+    def page(self, number):
+        return self._get_page(self.submissions, 1, self)
+
+
+class KeysetChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        if getattr(self.paginator, "keyset", False):
+            # Only the submissions on the current page are known
+            self.result_count = len(self.result_list)
+            self.can_show_all = False
+
+
 class FormSubmissionAdmin(admin.ModelAdmin):
     list_display = ["form", "url", "submitted_at", "data_summary"]
     list_filter = ["form"]
+    search_fields = ["summary"]
     fields = ["form", "url", "submitted_at"]
     readonly_fields = fields
+    show_full_result_count = False
+    # The form is prefetched in get_queryset instead
+    list_select_related = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # The cursor isn't a filter, hide it from the changelist
+        if CURSOR_VAR in request.GET:
+            request.GET = request.GET.copy()
+            request.form_designer_cursor = request.GET.pop(CURSOR_VAR)[-1]
+        return super().changelist_view(request, extra_context)
+
+    def get_paginator(self, request, queryset, per_page, *args, **kwargs):
+        # Keyset pagination only works when sorting by date, newest first
+        if list(queryset.query.order_by)[:1] != ["-submitted_at"]:
+            return super().get_paginator(request, queryset, per_page, *args, **kwargs)
+        return KeysetPaginator(
+            queryset,
+            per_page,
+            request=request,
+            cursor=getattr(request, "form_designer_cursor", None),
+        )
+
+    def get_queryset(self, request):
+        # Prefetching (instead of selecting) the form means that all
+        # submissions of the same form share one form instance and therefore
+        # also the prefetched fields and cached field loaders.
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(
+                Prefetch(
+                    "form", queryset=models.Form.objects.prefetch_related("fields")
+                )
+            )
+        )
 
     def data_summary(self, submission):
-        data = submission.formatted_data()
+        data = submission.summary or submission.formatted_data()
         if len(data) > 100:
             return "%s..." % data[:95]
         return data
@@ -1,10 +1,20 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.middleware.csrf import get_token
 from django.template.loader import render_to_string
 from django.utils.encoding import smart_str
-from django.utils.translation import gettext_lazy as _
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language, gettext_lazy as _
 from feincms.admin.item_editor import FeinCMSInline
 
-from form_designer.models import Form
+from form_designer.models import Form, _form_class_cache
+from form_designer.signals import timed
+
+
+# Rendered instead of the CSRF token into cached unbound forms
+CSRF_TOKEN_PLACEHOLDER = "form-designer-csrf-token"
 
 
 class FormContentInline(FeinCMSInline):
@@ -33,6 +43,71 @@ class FormContent(models.Model):
         verbose_name = _("form")
         verbose_name_plural = _("forms")
 
+    @classmethod
+    def prepare_forms(cls, contents):
+        """
+        Load the forms of all passed contents in one go
+
+        Useful when the content blocks have been fetched without going through
+        ``get_queryset``, e.g. individually or from several pages. Fields are
+        only prefetched for forms whose form class isn't cached yet.
+        """
+        contents = list(contents)
+        forms = Form.objects.in_bulk({content.form_id for content in contents})
+        models.prefetch_related_objects(
+            [
+                form
+                for form in forms.values()
+                if _form_class_cache.get(form.pk, (None,))[0] != form.version
+            ],
+            "fields",
+        )
+        for content in contents:
+            content.form = forms[content.form_id]
+        return contents
+
+    def _unbound_form_cache_key(self, form_class, prefix):
+        """
+        Return the cache key for the rendered unbound form or ``None`` if the
+        form shouldn't be cached
+        """
+        if (
+            getattr(settings, "FORM_DESIGNER_FORM_CACHE_TIMEOUT", None) is None
+            or not form_class.cacheable
+        ):
+            return None
+        return ":".join(
+            (
+                "form-designer-form",
+                self._meta.label_lower,
+                str(self.pk),
+                self.form.version.hex,
+                get_language() or "",
+                prefix,
+                str(int(self.show_form_title)),
+                self.template,
+            )
+        )
+
+    def _render_form(self, form_instance, *, cache_key=None):
+        context = {"content": self, "form": form_instance}
+        if cache_key is not None:
+            context["csrf_token"] = CSRF_TOKEN_PLACEHOLDER
+        return render_to_string(self.template, context, request=self.request)
+
+    def _insert_csrf_token(self, html):
+        return mark_safe(html.replace(CSRF_TOKEN_PLACEHOLDER, get_token(self.request)))
+
+    def _render_rate_limited(self):
+        return render_to_string(
+            self.template,
+            {
+                "content": self,
+                "message": _("Too many submissions. Please try again later."),
+            },
+            request=self.request,
+        )
+
     def process_valid_form(self, request, form_instance, **kwargs):
         """Process form and return response (hook method)."""
         process_result = self.form.process(form_instance, request)
@@ -45,28 +120,102 @@ class FormContent(models.Model):
     def process(self, request, **kwargs):
         self.request = request
 
-        form_class = self.form.form_class()
         prefix = "fc%d" % self.id
         formcontent = self.request.POST.get("_formcontent")
-
-        if self.request.method == "POST" and (
+        cache_key = None
+        submitted = self.request.method == "POST" and (
             not formcontent or formcontent == smart_str(self.id)
-        ):
+        )
+
+        # Check the rate limit before doing any work
+        if submitted and self.form.is_rate_limited(self.request):
+            self._rendered_content = self._render_rate_limited()
+            return
+
+        form_class = self.form.form_class()
+        if submitted:
             form_instance = form_class(self.request.POST, prefix=prefix)
 
-            if form_instance.is_valid():
+            with timed(self.form, "is_valid"):
+                is_valid = form_instance.is_valid()
+            if is_valid:
                 self._rendered_content = self.process_valid_form(
                     self.request, form_instance, **kwargs
                 )
                 return
         else:
+            cache_key = self._unbound_form_cache_key(form_class, prefix)
+            if cache_key and (html := cache.get(cache_key)) is not None:
+                self._rendered_content = self._insert_csrf_token(html)
+                return
             form_instance = form_class(prefix=prefix)
 
-        self._rendered_content = render_to_string(
+        self._rendered_content = self._render_form(form_instance, cache_key=cache_key)
+        if cache_key:
+            cache.set(
+                cache_key,
+                self._rendered_content,
+                settings.FORM_DESIGNER_FORM_CACHE_TIMEOUT,
+            )
+            self._rendered_content = self._insert_csrf_token(self._rendered_content)
+
+    async def aprocess_valid_form(self, request, form_instance, **kwargs):
+        """Async variant of ``process_valid_form`` (hook method)."""
+        process_result = await self.form.aprocess(form_instance, request)
+        return render_to_string(
             self.template,
-            {"content": self, "form": form_instance},
-            request=self.request,
+            {"content": self, "message": self.success_message or process_result or ""},
+            request=request,
+        )
+
+    async def aprocess(self, request, **kwargs):
+        """
+        Async variant of ``process``
+
+        The form and its fields are loaded using the async ORM, validation
+        runs in a thread because validators may perform blocking I/O.
+        """
+        self.request = request
+
+        if not type(self).form.is_cached(self):
+            self.form = await Form.objects.aget(pk=self.form_id)
+        prefix = "fc%d" % self.id
+        formcontent = self.request.POST.get("_formcontent")
+        cache_key = None
+        submitted = self.request.method == "POST" and (
+            not formcontent or formcontent == smart_str(self.id)
         )
 
+        if submitted and await sync_to_async(self.form.is_rate_limited)(self.request):
+            self._rendered_content = self._render_rate_limited()
+            return
+
+        form_class = await self.form.aform_class()
+        if submitted:
+            form_instance = form_class(self.request.POST, prefix=prefix)
+
+            with timed(self.form, "is_valid"):
+                is_valid = await sync_to_async(form_instance.is_valid)()
+            if is_valid:
+                self._rendered_content = await self.aprocess_valid_form(
+                    self.request, form_instance, **kwargs
+                )
+                return
+        else:
+            cache_key = self._unbound_form_cache_key(form_class, prefix)
+            if cache_key and (html := await cache.aget(cache_key)) is not None:
+                self._rendered_content = self._insert_csrf_token(html)
+                return
+            form_instance = form_class(prefix=prefix)
+
+        self._rendered_content = self._render_form(form_instance, cache_key=cache_key)
+        if cache_key:
+            await cache.aset(
+                cache_key,
+                self._rendered_content,
+                settings.FORM_DESIGNER_FORM_CACHE_TIMEOUT,
+            )
+            self._rendered_content = self._insert_csrf_token(self._rendered_content)
+
     def render(self, **kwargs):
         return getattr(self, "_rendered_content", "")
@@ -43,6 +43,7 @@ FIELD_TYPES = [
         "verbose_name": _("checkbox"),
         "field": partial(forms.BooleanField, required=False),
         "clean_field": [disallow_choices],
+        "export_type": "bool",
     },
     {
         "type": "select",
@@ -63,6 +64,7 @@ FIELD_TYPES = [
             forms.MultipleChoiceField, widget=forms.CheckboxSelectMultiple
         ),
         "clean_field": [require_choices],
+        "export_type": "list",
     },
     {
         "type": "date",
@@ -71,6 +73,7 @@ FIELD_TYPES = [
             forms.DateField, widget=forms.DateInput(attrs={"type": "date"})
         ),
         "clean_field": [disallow_choices],
+        "export_type": "date",
     },
     {
         "type": "hidden",
@@ -116,6 +119,8 @@ if apps.is_installed("captcha"):  # pragma: no cover
                 "type": "simple captcha",
                 "verbose_name": _("Simple CAPTCHA"),
                 "field": CaptchaField,
+                # Every rendered form contains a new challenge
+                "cacheable": False,
             }
         )
 
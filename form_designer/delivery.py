@@ -0,0 +1,307 @@
+"""
+Delivery of queued digests, outbox mails and webhook requests
+
+These functions are run by the ``send_form_designer_*`` management commands.
+"""
+
+import http.client
+import logging
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.formats import date_format
+from django.utils.translation import ngettext
+
+from form_designer.models import (
+    DigestEntry,
+    Form,
+    FormSubmission,
+    OutboxMail,
+    WebhookDelivery,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def send_digests():
+    """
+    Send digest emails for all recipient lists with a queued entry older than
+    the configured interval of its form
+
+    Entries of all forms sending their digest to the same addresses are
+    combined into one email. The entries are claimed before sending so that
+    overlapping runs do not send them twice; entries which could not be sent
+    are sent again once the claim expires. Returns the number of sent digests.
+    """
+    sent = 0
+    now = timezone.now()
+    db_connection = connections[DigestEntry.objects.db]
+    connection = get_connection()
+    # The SMTP backend's timeout, or a generous default for other backends
+    timeout = getattr(connection, "timeout", None) or 10
+
+    with transaction.atomic():
+        entries = list(
+            DigestEntry.objects.filter(
+                Q(claimed_until=None) | Q(claimed_until__lte=now)
+            ).select_for_update(
+                skip_locked=db_connection.features.has_select_for_update_skip_locked
+            )
+        )
+        forms = (
+            Form.objects.filter(pk__in={entry.form_id for entry in entries})
+            .prefetch_related("fields")
+            .in_bulk()
+        )
+        digests = {}
+        deactivated = []
+        for entry in entries:
+            entry.form = forms[entry.form_id]
+            if not (config := entry.form.config.get("email_digest")):
+                # The action has been deactivated in the meantime
+                deactivated.append(entry.pk)
+                continue
+            to = tuple(email.strip() for email in config["email"].split(","))
+            digests.setdefault(to, []).append(entry)
+        digests = {
+            to: entries
+            for to, entries in digests.items()
+            if any(
+                entry.created_at + _digest_interval(entry.form) <= now
+                for entry in entries
+            )
+        }
+        DigestEntry.objects.filter(pk__in=deactivated).delete()
+        DigestEntry.objects.filter(
+            pk__in=[entry.pk for entries in digests.values() for entry in entries]
+        ).update(claimed_until=now + timedelta(seconds=timeout * (len(digests) + 1)))
+
+    if not digests:
+        return sent
+
+    with connection:
+        for to, entries in digests.items():
+            titles = list(dict.fromkeys(entry.form.title for entry in entries))
+            body = "\n\n".join(
+                "{}{} ({})\n\n{}".format(
+                    f"{entry.form.title}, " if len(titles) > 1 else "",
+                    date_format(
+                        timezone.template_localtime(entry.created_at),
+                        "DATETIME_FORMAT",
+                    ),
+                    entry.url,
+                    FormSubmission(form=entry.form, data=entry.data).formatted_data(),
+                )
+                for entry in entries
+            )
+            try:
+                EmailMessage(
+                    ngettext(
+                        "%(title)s: %(count)s submission",
+                        "%(title)s: %(count)s submissions",
+                        len(entries),
+                    )
+                    % {"title": ", ".join(titles), "count": len(entries)},
+                    body,
+                    to=list(to),
+                    connection=connection,
+                ).send()
+            except Exception as exc:
+                logger.warning(
+                    "Sending the digest to %s failed: %r", ", ".join(to), exc
+                )
+                continue
+            DigestEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+            sent += 1
+    return sent
+
+
+def _digest_interval(form):
+    return timedelta(minutes=int(form.config["email_digest"].get("interval") or 60))
+
+
+def send_outbox_mails(*, batch_size=100, max_attempts=5, retry_delay=60):
+    """
+    Send a batch of due outbox mails over a single connection
+
+    Failed mails are retried with exponential backoff starting at
+    ``retry_delay`` seconds and given up after ``max_attempts`` attempts.
+    Returns the number of sent and failed mails.
+
+    The batch is claimed like in ``send_webhooks`` so that no transaction is
+    open while talking to the mail server.
+    """
+    sent = failed = 0
+    db_connection = connections[OutboxMail.objects.db]
+    connection = get_connection()
+    # The SMTP backend's timeout, or a generous default for other backends
+    timeout = getattr(connection, "timeout", None) or 10
+    with transaction.atomic():
+        mails = list(
+            OutboxMail.objects.filter(next_attempt_at__lte=timezone.now())
+            .order_by("next_attempt_at")
+            .select_for_update(
+                skip_locked=db_connection.features.has_select_for_update_skip_locked
+            )[:batch_size]
+        )
+        OutboxMail.objects.filter(pk__in=[mail.pk for mail in mails]).update(
+            next_attempt_at=timezone.now()
+            + timedelta(seconds=timeout * (len(mails) + 1))
+        )
+    if not mails:
+        return sent, failed
+
+    def fail(mail, exc):
+        mail.attempts += 1
+        mail.last_error = repr(exc)
+        mail.next_attempt_at = (
+            timezone.now() + timedelta(seconds=retry_delay * 2 ** (mail.attempts - 1))
+            if mail.attempts < max_attempts
+            else None
+        )
+        mail.save()
+
+    try:
+        connection.open()
+    except Exception as exc:
+        # The mail server is unreachable, retry the whole batch later
+        logger.warning("Opening the mail connection failed: %r", exc)
+        for mail in mails:
+            fail(mail, exc)
+        return sent, len(mails)
+
+    with connection:
+        for mail in mails:
+            try:
+                EmailMessage(
+                    mail.subject,
+                    mail.body,
+                    to=mail.to,
+                    cc=mail.cc,
+                    connection=connection,
+                ).send()
+            except Exception as exc:
+                fail(mail, exc)
+                failed += 1
+            else:
+                mail.delete()
+                sent += 1
+    return sent, failed
+
+
+class WebhookConnectionPool:
+    """
+    Keep-alive HTTP(S) connections reused per scheme, host and port
+
+    Not thread-safe; use one pool per thread.
+    """
+
+    def __init__(self, *, timeout=10):
+        self.timeout = timeout
+        self._connections = {}
+
+    def post(self, url, body, headers):
+        """
+        POST ``body`` to ``url`` and return the response status
+
+        A request over a reused connection which fails, e.g. because the
+        server closed the idle connection in the meantime, is retried once
+        over a new connection.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+        while True:
+            reused = key in self._connections
+            if not reused:
+                connection_class = (
+                    http.client.HTTPSConnection
+                    if parts.scheme == "https"
+                    else http.client.HTTPConnection
+                )
+                self._connections[key] = connection_class(
+                    parts.hostname, parts.port, timeout=self.timeout
+                )
+            connection = self._connections[key]
+            try:
+                connection.request("POST", path, body=body.encode(), headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self._connections.pop(key).close()
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                self._connections.pop(key).close()
+            return response.status
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+
+def send_webhooks(*, batch_size=100, max_attempts=5, retry_delay=60, pool=None):
+    """
+    Deliver a batch of due webhook requests
+
+    Uses ``pool`` (a ``WebhookConnectionPool``) if given so that connections
+    are kept alive across batches. Failed deliveries and responses with a
+    status outside 2xx are retried with exponential backoff like outbox
+    mails. Returns the number of delivered and failed requests.
+
+    The batch is claimed by moving its next attempt into the future before
+    sending, so that no locks are held during the requests. Deliveries of a
+    crashed process are retried once the claim expires.
+    """
+    sent = failed = 0
+    db_connection = connections[WebhookDelivery.objects.db]
+    own_pool = pool is None
+    if own_pool:
+        pool = WebhookConnectionPool()
+    try:
+        with transaction.atomic():
+            deliveries = list(
+                WebhookDelivery.objects.filter(next_attempt_at__lte=timezone.now())
+                .order_by("next_attempt_at")
+                .select_for_update(
+                    skip_locked=db_connection.features.has_select_for_update_skip_locked
+                )[:batch_size]
+            )
+            WebhookDelivery.objects.filter(
+                pk__in=[delivery.pk for delivery in deliveries]
+            ).update(
+                next_attempt_at=timezone.now()
+                + timedelta(seconds=pool.timeout * (len(deliveries) + 1))
+            )
+
+        for delivery in deliveries:
+            try:
+                status = pool.post(delivery.url, delivery.body, delivery.headers)
+                if not 200 <= status < 300:
+                    raise http.client.HTTPException(f"HTTP status {status}")
+            except Exception as exc:
+                delivery.attempts += 1
+                delivery.last_error = repr(exc)
+                delivery.next_attempt_at = (
+                    timezone.now()
+                    + timedelta(seconds=retry_delay * 2 ** (delivery.attempts - 1))
+                    if delivery.attempts < max_attempts
+                    else None
+                )
+                delivery.save()
+                failed += 1
+            else:
+                delivery.delete()
+                sent += 1
+    finally:
+        if own_pool:
+            pool.close()
+    return sent, failed
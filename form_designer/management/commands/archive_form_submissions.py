@@ -0,0 +1,50 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from form_designer.models import Form, archive_submissions
+
+
+class Command(BaseCommand):
+    help = "Move old form submissions into compressed archive files."
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            "--days", type=int, help="Archive submissions older than DAYS days."
+        )
+        group.add_argument(
+            "--before", help="Archive submissions made before this date (YYYY-MM-DD)."
+        )
+        parser.add_argument(
+            "--form",
+            type=int,
+            action="append",
+            dest="forms",
+            help="Only archive submissions of the form with this primary key."
+            " May be given several times.",
+        )
+
+    def handle(self, **options):
+        if options["days"] is not None:
+            before = timezone.now() - dt.timedelta(days=options["days"])
+        elif date := parse_date(options["before"]):
+            before = dt.datetime.combine(date, dt.time.min)
+            if settings.USE_TZ:
+                before = timezone.make_aware(before)
+        else:
+            raise CommandError(f"Invalid date {options['before']!r}.")
+
+        forms = Form.objects.all()
+        if options["forms"]:
+            forms = forms.filter(pk__in=options["forms"])
+
+        for form in forms:
+            if archive := archive_submissions(form, before=before):
+                self.stdout.write(
+                    f"Archived {archive.count} submissions of {form} into"
+                    f" {archive.file.name}."
+                )
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from form_designer import exports
+from form_designer.models import Form, parse_since
+
+
+class Command(BaseCommand):
+    help = "Export the submissions of a form as Apache Parquet or Arrow IPC file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("form", type=int, help="Primary key of the form.")
+        parser.add_argument("path", help="Path of the file to write.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(exports.FORMATS),
+            default="parquet",
+            help="File format (default: parquet).",
+        )
+        parser.add_argument(
+            "--row-group-size",
+            type=int,
+            default=10000,
+            help="Number of submissions per row group (default: 10000).",
+        )
+        parser.add_argument(
+            "--cursor",
+            help="Only export submissions after this cursor, see the"
+            " X-Export-Cursor header of incremental exports.",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only export submissions made at or after this date or datetime.",
+        )
+        parser.add_argument(
+            "--archived",
+            action="store_true",
+            help="Include archived submissions.",
+        )
+
+    def handle(self, **options):
+        if not exports.is_available():
+            raise CommandError("Columnar exports require pyarrow.")
+        try:
+            form = Form.objects.get(pk=options["form"])
+        except Form.DoesNotExist as exc:
+            raise CommandError(f"Form {options['form']} does not exist.") from exc
+
+        submissions = None
+        if options["cursor"] or options["since"]:
+            try:
+                submissions = form.submissions_after(
+                    options["cursor"],
+                    since=parse_since(options["since"]) if options["since"] else None,
+                )
+            except ValueError as exc:
+                raise CommandError(str(exc)) from exc
+
+        with open(options["path"], "wb") as file:
+            count = exports.write_submissions(
+                form,
+                file,
+                format=options["format"],
+                submissions=submissions,
+                include_archived=options["archived"] and submissions is None,
+                row_group_size=options["row_group_size"],
+            )
+        self.stdout.write(f"Exported {count} submissions to {options['path']}.")
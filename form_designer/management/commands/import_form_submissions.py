@@ -0,0 +1,82 @@
+import csv
+import json
+
+from django import forms
+from django.core.management.base import BaseCommand, CommandError
+
+from form_designer.models import Form
+
+
+class Command(BaseCommand):
+    help = "Import form submissions from a JSONL or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("form", type=int, help="Primary key of the form.")
+        parser.add_argument("path", help="Path to a .jsonl or .csv file.")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="File format (default: determined by the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of submissions inserted per query (default: 500).",
+        )
+        parser.add_argument(
+            "--url", default="", help="URL stored with the imported submissions."
+        )
+        parser.add_argument(
+            "--action",
+            action="append",
+            default=[],
+            dest="actions",
+            help="Also run the configured action with this key for every"
+            ' imported row, e.g. "email". May be given several times.',
+        )
+
+    def handle(self, **options):
+        try:
+            form = Form.objects.get(pk=options["form"])
+        except Form.DoesNotExist as exc:
+            raise CommandError(f"Form {options['form']} does not exist.") from exc
+
+        fmt = options["format"] or (
+            "csv" if options["path"].endswith(".csv") else "jsonl"
+        )
+
+        with open(options["path"], encoding="utf-8", newline="") as f:
+            rows = self.csv_rows(form, f) if fmt == "csv" else self.jsonl_rows(f)
+            created, errors = form.bulk_create_submissions(
+                rows,
+                url=options["url"],
+                batch_size=options["batch_size"],
+                actions=options["actions"],
+            )
+
+        for index, row_errors in errors:
+            self.stderr.write(f"Row {index + 1}: {row_errors.as_json()}")
+        self.stdout.write(
+            f"Imported {created} submissions, skipped {len(errors)} invalid rows."
+        )
+
+    def jsonl_rows(self, f):
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+    def csv_rows(self, form, f):
+        # Multiple choice values are comma-separated, same as the choices
+        multiple = {
+            name
+            for name, field in form.form_class().base_fields.items()
+            if isinstance(field, forms.MultipleChoiceField)
+        }
+        for row in csv.DictReader(f):
+            yield {
+                key: [v.strip() for v in value.split(",") if v.strip()]
+                if key in multiple
+                else value
+                for key, value in row.items()
+            }
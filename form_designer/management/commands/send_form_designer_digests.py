@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from form_designer.delivery import send_digests
+
+
+class Command(BaseCommand):
+    help = "Send the digest emails of forms using the email digest action."
+
+    def handle(self, **options):
+        if sent := send_digests():
+            self.stdout.write(f"Sent {sent} digests.")
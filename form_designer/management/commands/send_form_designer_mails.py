@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from form_designer.delivery import send_outbox_mails
+
+
+class Command(BaseCommand):
+    help = "Send the mails queued in the form designer's outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of mails sent over one connection (default: 100).",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Give up sending a mail after this many attempts (default: 5).",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=int,
+            default=60,
+            help="Seconds to wait before the first retry, doubled for each"
+            " further attempt (default: 60).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Keep running and check the outbox every INTERVAL seconds.",
+        )
+
+    def handle(self, **options):
+        while True:
+            self.drain(options)
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def drain(self, options):
+        while True:
+            sent, failed = send_outbox_mails(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+                retry_delay=options["retry_delay"],
+            )
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} mails, {failed} failed.")
+            if sent + failed < options["batch_size"]:
+                break
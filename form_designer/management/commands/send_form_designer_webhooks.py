@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from form_designer.delivery import WebhookConnectionPool, send_webhooks
+
+
+class Command(BaseCommand):
+    help = "Deliver the queued webhook requests of the form designer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of requests delivered per transaction (default: 100).",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Give up delivering a request after this many attempts (default: 5).",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=int,
+            default=60,
+            help="Seconds to wait before the first retry, doubled for each"
+            " further attempt (default: 60).",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10,
+            help="Timeout for connecting and reading responses in seconds"
+            " (default: 10).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Keep running and check the queue every INTERVAL seconds.",
+        )
+
+    def handle(self, **options):
+        # Connections are kept alive between batches and intervals
+        pool = WebhookConnectionPool(timeout=options["timeout"])
+        try:
+            while True:
+                self.drain(pool, options)
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            pool.close()
+
+    def drain(self, pool, options):
+        while True:
+            sent, failed = send_webhooks(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+                retry_delay=options["retry_delay"],
+                pool=pool,
+            )
+            if sent or failed:
+                self.stdout.write(f"Delivered {sent} requests, {failed} failed.")
+            if sent + failed < options["batch_size"]:
+                break
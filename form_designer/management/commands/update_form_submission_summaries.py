@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from form_designer.models import Form, FormSubmission
+
+
+class Command(BaseCommand):
+    help = "Fill in the summaries of form submissions which do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute all summaries, e.g. after changing field titles.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of submissions updated per query (default: 500).",
+        )
+
+    def handle(self, **options):
+        submissions = FormSubmission.objects.order_by("pk").prefetch_related(
+            Prefetch("form", queryset=Form.objects.prefetch_related("fields"))
+        )
+        if not options["all"]:
+            submissions = submissions.filter(summary="")
+
+        updated = 0
+        last_pk = 0
+        while batch := list(
+            submissions.filter(pk__gt=last_pk)[: options["batch_size"]]
+        ):
+            for submission in batch:
+                submission.summary = submission.formatted_data()
+            FormSubmission.objects.bulk_update(batch, ["summary"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(f"Updated {updated} summaries.")
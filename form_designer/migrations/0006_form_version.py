@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:29
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0005_remove_form_config_json_form_config_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="version",
+            field=models.UUIDField(
+                default=uuid.uuid4, editable=False, verbose_name="version"
+            ),
+        ),
+    ]
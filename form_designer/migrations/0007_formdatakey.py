@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    FormSubmission = apps.get_model("form_designer", "FormSubmission")
+    FormDataKey = apps.get_model("form_designer", "FormDataKey")
+
+    seen = {}
+    submissions = FormSubmission.objects.order_by("submitted_at").values_list(
+        "form_id", "submitted_at", "data"
+    )
+    for form_id, submitted_at, data in submissions.iterator(chunk_size=2000):
+        if not isinstance(data, dict):
+            continue
+        for key in data:
+            if (form_id, key) in seen:
+                seen[form_id, key][1] = submitted_at
+            else:
+                seen[form_id, key] = [submitted_at, submitted_at]
+
+    FormDataKey.objects.bulk_create(
+        [
+            FormDataKey(
+                form_id=form_id,
+                key=key,
+                first_seen_at=first_seen_at,
+                last_seen_at=last_seen_at,
+            )
+            for (form_id, key), (first_seen_at, last_seen_at) in seen.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0006_form_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FormDataKey",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100, verbose_name="key")),
+                ("first_seen_at", models.DateTimeField(verbose_name="first seen at")),
+                ("last_seen_at", models.DateTimeField(verbose_name="last seen at")),
+                (
+                    "form",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="data_keys",
+                        to="form_designer.form",
+                        verbose_name="form",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "data key",
+                "verbose_name_plural": "data keys",
+                "ordering": ["key"],
+                "unique_together": {("form", "key")},
+            },
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0009_digestentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubmissionArchive",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to="form_designer/archives/", verbose_name="file"
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(verbose_name="count")),
+                (
+                    "first_submitted_at",
+                    models.DateTimeField(verbose_name="first submitted at"),
+                ),
+                (
+                    "last_submitted_at",
+                    models.DateTimeField(verbose_name="last submitted at"),
+                ),
+                ("keys", models.JSONField(default=list, verbose_name="keys")),
+                (
+                    "form",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archives",
+                        to="form_designer.form",
+                        verbose_name="form",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "submission archive",
+                "verbose_name_plural": "submission archives",
+                "ordering": ["-last_submitted_at"],
+            },
+        ),
+    ]
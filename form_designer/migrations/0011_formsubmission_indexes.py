@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0010_submissionarchive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "submitted_at"], name="fd_submission_form_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(fields=["submitted_at"], name="fd_submission_date_idx"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0011_formsubmission_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="summary",
+            field=models.TextField(
+                blank=True,
+                help_text="The formatted data at the time of submission.",
+                verbose_name="summary",
+            ),
+        ),
+    ]
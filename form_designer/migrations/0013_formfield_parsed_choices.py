@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def forwards(apps, schema_editor):
+    FormField = apps.get_model("form_designer", "FormField")
+
+    fields = list(FormField.objects.exclude(choices="").only("id", "choices"))
+    for field in fields:
+        field.parsed_choices = [
+            {"value": value, "label": value, "slug": slugify(value)}
+            for value in (value.strip() for value in field.choices.split(","))
+        ]
+    FormField.objects.bulk_update(fields, ["parsed_choices"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0012_formsubmission_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formfield",
+            name="parsed_choices",
+            field=models.JSONField(
+                blank=True, default=list, editable=False, verbose_name="parsed choices"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="formfield",
+            name="choices",
+            field=models.TextField(
+                blank=True, help_text="Comma-separated", verbose_name="choices"
+            ),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
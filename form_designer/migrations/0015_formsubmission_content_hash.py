@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0014_webhookdelivery"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, verbose_name="content hash"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "content_hash", "submitted_at"],
+                name="fd_submission_hash_idx",
+            ),
+        ),
+    ]
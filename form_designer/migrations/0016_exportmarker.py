@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0015_formsubmission_content_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportMarker",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cursor",
+                    models.CharField(
+                        help_text="Points at the last exported submission.",
+                        max_length=100,
+                        verbose_name="cursor",
+                    ),
+                ),
+                (
+                    "exported_at",
+                    models.DateTimeField(auto_now=True, verbose_name="exported at"),
+                ),
+                (
+                    "form",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_markers",
+                        to="form_designer.form",
+                        verbose_name="form",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "export marker",
+                "verbose_name_plural": "export markers",
+                "unique_together": {("form", "user")},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:24
+
+from django.db import migrations, models
+
+import form_designer.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0016_exportmarker"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="form",
+            name="version",
+            field=models.UUIDField(
+                default=form_designer.models._new_form_version,
+                editable=False,
+                verbose_name="version",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("form_designer", "0017_form_version_uuid1"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="digestentry",
+            name="claimed_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set while the entry is being sent.",
+                null=True,
+                verbose_name="claimed until",
+            ),
+        ),
+    ]
@@ -1,38 +1,106 @@
+import asyncio
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import random
+import tempfile
+import time
+import uuid
 import warnings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
 from functools import partial
+from types import MappingProxyType
 from typing import Optional
 
+import django
+from asgiref.sync import sync_to_async
 from django import forms
 from django.apps import apps
 from django.conf import settings
 from django.contrib.admin import widgets
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.core.files import File
 from django.core.mail import EmailMessage
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator, validate_email
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Count, Q
 from django.db.models.fields import BLANK_CHOICE_DASH
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template import Context, Template, TemplateSyntaxError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.html import format_html, format_html_join
 from django.utils.inspect import func_accepts_kwargs
 from django.utils.module_loading import import_string
 from django.utils.text import capfirst, slugify
-from django.utils.translation import gettext, gettext_lazy as _
+from django.utils.translation import (
+    get_language,
+    gettext,
+    gettext_lazy as _,
+    override,
+)
+
+from form_designer.signals import timed
+
+
+logger = logging.getLogger(__name__)
+
+# Django 6.0 changes the default scheme of URLs entered without one to https
+_URL_FIELD_KWARGS = {"assume_scheme": "https"} if django.VERSION >= (5, 0) else {}
+
+
+def submission_url(request):
+    if request is None:
+        return ""
+    return request.build_absolute_uri(request.get_full_path())
+
+
+def submission_summary(model_instance, form_instance):
+    """
+    Return the formatted data of a valid form instance
+
+    The text is computed once per form instance so that the stored summary and
+    the mail body don't format the same data twice.
+    """
+    try:
+        return form_instance._submission_summary
+    except AttributeError:
+        submission = FormSubmission(
+            form=model_instance, data=form_instance.cleaned_data
+        )
+        form_instance._submission_summary = submission.formatted_data()
+        return form_instance._submission_summary
 
 
 def create_form_submission(model_instance, form_instance, request, **kwargs):
     return FormSubmission.objects.create(
         form=model_instance,
         data=form_instance.cleaned_data,
-        url=request.build_absolute_uri(request.get_full_path()),
+        url=submission_url(request),
+        content_hash=kwargs.get("content_hash", ""),
+        summary=submission_summary(model_instance, form_instance),
     )
 
 
-def send_as_mail(model_instance, form_instance, request, config, **kwargs):
-    submission = FormSubmission(
+async def acreate_form_submission(model_instance, form_instance, request, **kwargs):
+    return await FormSubmission.objects.acreate(
         form=model_instance,
         data=form_instance.cleaned_data,
-        url=request.build_absolute_uri(request.get_full_path()),
+        url=submission_url(request),
+        content_hash=kwargs.get("content_hash", ""),
+        summary=await sync_to_async(submission_summary)(model_instance, form_instance),
     )
 
+
+def send_as_mail(model_instance, form_instance, request, config, **kwargs):
     recipients = {
         "to": [email.strip() for email in config["email"].split(",")],
     }
@@ -41,11 +109,107 @@ def send_as_mail(model_instance, form_instance, request, config, **kwargs):
     ):
         recipients["cc"] = [email]
 
-    EmailMessage(
-        model_instance.title,
-        submission.formatted_data(),
-        **recipients,
-    ).send(fail_silently=True)
+    if getattr(settings, "FORM_DESIGNER_EMAIL_OUTBOX", False):
+        OutboxMail.objects.create(
+            subject=model_instance.title,
+            body=submission_summary(model_instance, form_instance),
+            **recipients,
+        )
+    else:
+        EmailMessage(
+            model_instance.title,
+            submission_summary(model_instance, form_instance),
+            **recipients,
+        ).send(fail_silently=True)
+    return _("Thank you, your input has been received.")
+
+
+def queue_digest_entry(model_instance, form_instance, request, **kwargs):
+    DigestEntry.objects.create(
+        form=model_instance,
+        data=form_instance.cleaned_data,
+        url=submission_url(request),
+    )
+    return _("Thank you, your input has been received.")
+
+
+async def aqueue_digest_entry(model_instance, form_instance, request, **kwargs):
+    await DigestEntry.objects.acreate(
+        form=model_instance,
+        data=form_instance.cleaned_data,
+        url=submission_url(request),
+    )
+    return _("Thank you, your input has been received.")
+
+
+def parse_webhook_headers(value):
+    """
+    Parse ``Name: value`` lines into a dict of HTTP headers
+    """
+    headers = {}
+    for line in value.splitlines():
+        if not line.strip():
+            continue
+        name, sep, header_value = line.partition(":")
+        if not sep or not name.strip():
+            raise forms.ValidationError(
+                _("Invalid header %(line)r, use 'Name: value'."),
+                params={"line": line},
+            )
+        headers[name.strip()] = header_value.strip()
+    return headers
+
+
+def validate_webhook_payload(value):
+    try:
+        Template(value)
+    except TemplateSyntaxError as exc:
+        raise forms.ValidationError(
+            _("Invalid template: %(error)s"), params={"error": exc}
+        ) from exc
+
+
+def webhook_payload(model_instance, form_instance, request, config):
+    """
+    Return the request body for the webhook action
+
+    Without a payload template the body is a JSON object containing the form,
+    the URL and the submitted data. Templates are rendered using the same
+    values as context and without autoescaping.
+    """
+    context = {
+        "form": {"id": model_instance.pk, "title": model_instance.title},
+        "url": submission_url(request),
+        "data": form_instance.cleaned_data,
+    }
+    if template := config.get("payload"):
+        return Template(template).render(Context(context, autoescape=False))
+    return json.dumps(context, cls=DjangoJSONEncoder)
+
+
+def _webhook_delivery_kwargs(model_instance, form_instance, request, config):
+    headers = parse_webhook_headers(config.get("headers", ""))
+    if not any(name.lower() == "content-type" for name in headers):
+        headers["Content-Type"] = "application/json"
+    return {
+        "form": model_instance,
+        "url": config["url"],
+        "headers": headers,
+        "body": webhook_payload(model_instance, form_instance, request, config),
+    }
+
+
+def queue_webhook(model_instance, form_instance, request, config, **kwargs):
+    WebhookDelivery.objects.create(
+        **_webhook_delivery_kwargs(model_instance, form_instance, request, config)
+    )
+    return _("Thank you, your input has been received.")
+
+
+async def aqueue_webhook(model_instance, form_instance, request, config, **kwargs):
+    await WebhookDelivery.objects.acreate(
+        **_webhook_delivery_kwargs(model_instance, form_instance, request, config)
+    )
     return _("Thank you, your input has been received.")
 
 
@@ -65,6 +229,192 @@ def email_field_choices(
     return choices
 
 
+def _database_data_keys(submissions):
+    """
+    Return the set of all keys in the submissions' data using the database
+
+    Returns ``None`` if the database backend doesn't offer the required JSON
+    functions.
+    """
+    connection = connections[submissions.db]
+    if connection.vendor == "postgresql":
+        template = (
+            "SELECT DISTINCT jsonb_object_keys(s.data) FROM ({}) s"
+            " WHERE jsonb_typeof(s.data) = 'object'"
+        )
+    elif connection.vendor == "sqlite":
+        template = (
+            "SELECT DISTINCT j.key FROM ({}) s, json_each(s.data) j"
+            " WHERE json_type(s.data) = 'object'"
+        )
+    else:
+        return None
+
+    try:
+        sql, params = submissions.order_by().values("data").query.sql_with_params()
+    except EmptyResultSet:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(template.format(sql), params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _sqlite_json_path(key):
+    return '$."{}"'.format(key.replace('"', '\\"'))
+
+
+def _database_fill_counts(submissions, keys):
+    """
+    Return the number of submissions and a dict mapping each key to the number
+    of submissions containing a non-empty value for it using the database
+
+    Returns ``None`` if the database backend doesn't offer the required JSON
+    functions.
+    """
+    connection = connections[submissions.db]
+    if connection.vendor == "postgresql":
+        column = "COUNT(*) FILTER (WHERE s.data -> %s NOT IN ('null', '\"\"', '[]'))"
+        key_params = [[key] for key in keys]
+    elif connection.vendor == "sqlite":
+        column = (
+            "COALESCE(SUM(CASE COALESCE(json_type(s.data, %s), 'null')"
+            " WHEN 'text' THEN json_extract(s.data, %s) != ''"
+            " WHEN 'array' THEN json_array_length(s.data, %s) > 0"
+            " WHEN 'null' THEN 0 ELSE 1 END), 0)"
+        )
+        key_params = [[_sqlite_json_path(key)] * 3 for key in keys]
+    else:
+        return None
+
+    try:
+        sql, params = submissions.order_by().values("data").query.sql_with_params()
+    except EmptyResultSet:
+        return 0, dict.fromkeys(keys, 0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT {} FROM ({}) s".format(
+                ", ".join(["COUNT(*)"] + [column] * len(keys)), sql
+            ),
+            (*itertools.chain.from_iterable(key_params), *params),
+        )
+        total, *counts = cursor.fetchone()
+        return total, dict(zip(keys, counts))
+
+
+def _database_value_counts(submissions, key):
+    """
+    Return a dict mapping the values submitted for ``key`` to their number of
+    occurrences using the database
+
+    Each item of list values is counted separately. Returns ``None`` if the
+    database backend doesn't offer the required JSON functions.
+    """
+    connection = connections[submissions.db]
+    if connection.vendor == "postgresql":
+        template = (
+            "SELECT v.value, COUNT(*) FROM ({}) s,"
+            " jsonb_array_elements_text(CASE jsonb_typeof(s.data -> %s)"
+            " WHEN 'array' THEN s.data -> %s"
+            " ELSE jsonb_build_array(s.data -> %s) END) v"
+            " WHERE s.data ->> %s IS NOT NULL GROUP BY v.value"
+        )
+        key_params = [key] * 4
+    elif connection.vendor == "sqlite":
+        template = (
+            "SELECT j.value, COUNT(*) FROM ({}) s, json_each(s.data, %s) j"
+            " WHERE j.type NOT IN ('null', 'array', 'object') GROUP BY j.value"
+        )
+        key_params = [_sqlite_json_path(key)]
+    else:
+        return None
+
+    try:
+        sql, params = submissions.order_by().values("data").query.sql_with_params()
+    except EmptyResultSet:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(template.format(sql), (*params, *key_params))
+        return {str(value): count for value, count in cursor.fetchall()}
+
+
+def client_ip(request):
+    """
+    Return the IP address of the client
+
+    Override ``FORM_DESIGNER_CLIENT_IP`` with the dotted path of a function
+    accepting the request when running behind a reverse proxy.
+    """
+    if path := getattr(settings, "FORM_DESIGNER_CLIENT_IP", None):
+        return import_string(path)(request)
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _take_token(key, *, rate, per=60):
+    """
+    Take a token from the bucket stored at ``key``
+
+    The bucket holds at most ``rate`` tokens and is refilled with ``rate``
+    tokens per ``per`` seconds. Returns ``False`` if the bucket is empty.
+    """
+    now = time.time()
+    tokens, updated_at = cache.get(key, (rate, now))
+    tokens = min(rate, tokens + (now - updated_at) * rate / per)
+    if tokens < 1:
+        return False
+    cache.set(key, (tokens - 1, now), per)
+    return True
+
+
+# Seconds the caller waits for concurrent actions
+DEFAULT_ACTION_TIMEOUT = 10
+
+
+@functools.cache
+def _action_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "FORM_DESIGNER_ACTION_WORKERS", 4),
+        thread_name_prefix="form-designer-action",
+    )
+
+
+def _run_action(key, process, language, kwargs):
+    try:
+        with override(language), timed(kwargs["model_instance"], "process", key):
+            return process(**kwargs)
+    finally:
+        # Worker threads are long-lived, do not keep their connections open
+        connections.close_all()
+
+
+def _closing_connections(process):
+    @functools.wraps(process)
+    def wrapper(**kwargs):
+        try:
+            return process(**kwargs)
+        finally:
+            connections.close_all()
+
+    return wrapper
+
+
+def _is_concurrent(options):
+    concurrent = options.get("concurrent", False)
+    return concurrent() if callable(concurrent) else concurrent
+
+
+def _new_form_version():
+    # Time based so that versions can be ordered, see Form.form_class. Uses a
+    # random node instead of the MAC address.
+    return uuid.uuid1(random.getrandbits(48) | 1 << 40)
+
+
+def _is_newer_version(version, other):
+    if version.version != 1 or other.version != 1:
+        # Random versions of forms saved before versions were time based
+        return True
+    return version.time > other.time
+
+
 class Form(models.Model):
     CONFIG_OPTIONS = [
         (
@@ -76,6 +426,7 @@ class Form(models.Model):
                     " so that they may be exported later."
                 ),
                 "process": create_form_submission,
+                "aprocess": acreate_form_submission,
             },
         ),
         (
@@ -110,12 +461,153 @@ class Form(models.Model):
                     ),
                 ],
                 "process": send_as_mail,
+                # Sending mails doesn't depend on other actions, but mails
+                # queued in the outbox belong to the request's transaction
+                "concurrent": lambda: (
+                    not getattr(settings, "FORM_DESIGNER_EMAIL_OUTBOX", False)
+                ),
+            },
+        ),
+        (
+            "email_digest",
+            {
+                "title": _("Send email digest"),
+                "description": _(
+                    "Collect submissions and send them to a list of email"
+                    " addresses in one email per interval."
+                ),
+                "form_fields": lambda form: [
+                    (
+                        "email",
+                        forms.CharField(
+                            label=capfirst(_("email address")),
+                            validators=[validate_comma_separated_emails],
+                            help_text=_(
+                                "Separate multiple email addresses with commas."
+                            ),
+                            widget=widgets.AdminTextInputWidget,
+                        ),
+                    ),
+                    (
+                        "interval",
+                        forms.IntegerField(
+                            label=capfirst(_("interval")),
+                            help_text=_("Minutes between digest emails."),
+                            min_value=1,
+                            initial=60,
+                        ),
+                    ),
+                ],
+                "process": queue_digest_entry,
+                "aprocess": aqueue_digest_entry,
+            },
+        ),
+        (
+            "webhook",
+            {
+                "title": _("Send to webhook"),
+                "description": _(
+                    "Send the submitted form data to an HTTP endpoint. Requests"
+                    " are queued and delivered with retries."
+                ),
+                "form_fields": lambda form: [
+                    (
+                        "url",
+                        forms.URLField(
+                            label=capfirst(_("URL")),
+                            widget=widgets.AdminURLFieldWidget,
+                            **_URL_FIELD_KWARGS,
+                        ),
+                    ),
+                    (
+                        "headers",
+                        forms.CharField(
+                            label=capfirst(_("headers")),
+                            required=False,
+                            validators=[parse_webhook_headers],
+                            help_text=_("One 'Name: value' header per line."),
+                            widget=widgets.AdminTextareaWidget(attrs={"rows": 3}),
+                        ),
+                    ),
+                    (
+                        "payload",
+                        forms.CharField(
+                            label=capfirst(_("payload template")),
+                            required=False,
+                            validators=[validate_webhook_payload],
+                            help_text=_(
+                                "Template for the request body with the"
+                                " variables form, url and data. Sends the"
+                                " variables as JSON if empty."
+                            ),
+                            widget=widgets.AdminTextareaWidget(attrs={"rows": 5}),
+                        ),
+                    ),
+                ],
+                "process": queue_webhook,
+                "aprocess": aqueue_webhook,
+            },
+        ),
+        (
+            "idempotency",
+            {
+                "title": _("Ignore repeated submissions"),
+                "description": _(
+                    "Skip all actions when the same data is submitted again by"
+                    " the same client. Requires saving form submissions."
+                ),
+                "requires": ["save_fs"],
+                "form_fields": lambda form: [
+                    (
+                        "window",
+                        forms.IntegerField(
+                            label=capfirst(_("window")),
+                            help_text=_(
+                                "Seconds during which repeated submissions are ignored."
+                            ),
+                            min_value=1,
+                            initial=60,
+                        ),
+                    ),
+                ],
+            },
+        ),
+        (
+            "rate_limit",
+            {
+                "title": _("Limit submissions"),
+                "description": _(
+                    "Reject submissions exceeding the given number per minute"
+                    " before validating them."
+                ),
+                "form_fields": lambda form: [
+                    (
+                        "per_ip",
+                        forms.IntegerField(
+                            label=capfirst(_("per IP address")),
+                            help_text=_("Submissions per minute from one IP address."),
+                            min_value=1,
+                            required=False,
+                            initial=5,
+                        ),
+                    ),
+                    (
+                        "per_form",
+                        forms.IntegerField(
+                            label=capfirst(_("per form")),
+                            help_text=_("Submissions per minute in total."),
+                            min_value=1,
+                            required=False,
+                        ),
+                    ),
+                ],
             },
         ),
     ]
 
     title = models.CharField(_("title"), max_length=100)
     config = models.JSONField(_("config"), default=dict, blank=True)
+    version = models.UUIDField(_("version"), default=_new_form_version, editable=False)
 
     class Meta:
         verbose_name = _("form")
@@ -124,14 +616,76 @@ class Form(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.version = _new_form_version()
+        if (update_fields := kwargs.get("update_fields")) is not None:
+            kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+
+    save.alters_data = True
+
     def form_class(self):
+        """
+        Return the form class of this form
+
+        The fields and validators are built once per form version and shared
+        by all instances of the form. The returned class is a cheap subclass
+        binding this instance as ``model_instance``.
+        """
+        if self.pk is None:
+            return self._bind_form_class(self._build_form_class())
+        if (base := self._cached_form_class()) is None:
+            with timed(self, "form_class"):
+                base = self._build_form_class()
+            self._cache_form_class(base)
+        return self._bind_form_class(base)
+
+    async def aform_class(self):
+        """
+        Async variant of ``form_class`` using the async ORM to load fields
+        """
+        if self.pk is None:
+            return self._bind_form_class(self._build_form_class([]))
+        if (base := self._cached_form_class()) is None:
+            fields = [field async for field in self.fields.all()]
+            with timed(self, "form_class"):
+                base = self._build_form_class(fields)
+            self._cache_form_class(base)
+        return self._bind_form_class(base)
+
+    def _cached_form_class(self):
+        cached = _form_class_cache.get(self.pk)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        return None
+
+    def _cache_form_class(self, base):
+        # Instances loaded before the form changed must not replace the
+        # cached class of the newer version
+        cached = _form_class_cache.get(self.pk)
+        if cached is None or _is_newer_version(self.version, cached[0]):
+            _form_class_cache[self.pk] = (self.version, base)
+
+    def _bind_form_class(self, base):
+        bound = getattr(self, "_bound_form_class", None)
+        if bound is None or bound.__bases__[0] is not base:
+            bound = type(base.__name__, (base,), {"model_instance": self})
+            self._bound_form_class = bound
+        return bound
+
+    def _build_form_class(self, form_fields=None):
         fields = {
             "required_css_class": "required",
             "error_css_class": "error",
         }
 
-        for field in self.fields.all():
+        if form_fields is None:
+            form_fields = self.fields.all()
+        cacheable = True
+        for field in form_fields:
             field.add_formfield(fields, self)
+            cfg = FIELD_TYPES.get(field.type)
+            cacheable = cacheable and (cfg is None or cfg.get("cacheable", True))
 
         validators = []
         cfg = dict(self.CONFIG_OPTIONS)
@@ -139,34 +693,180 @@ class Form(models.Model):
             try:
                 validator = cfg[key]["validate"]
             except KeyError:
-                pass
+                continue
+            if func_accepts_kwargs(validator):
+                validators.append((key, validator, config))
             else:
-                if func_accepts_kwargs(validator):
-                    validator = partial(validator, config=config, model_instance=self)
-                else:
-                    warnings.warn(
-                        f"validate of {key!r} should accept **kwargs",
-                        DeprecationWarning,
-                        stacklevel=1,
-                    )
-                validators.append(validator)
+                warnings.warn(
+                    f"validate of {key!r} should accept **kwargs",
+                    DeprecationWarning,
+                    stacklevel=1,
+                )
+                validators.append((key, validator, None))
 
         class Form(forms.Form):
+            # Set by Form.form_class
+            model_instance = None
+
             def clean(self):
                 data = super().clean()
-                for validator in validators:
-                    validator(self, data)
+                for key, validator, config in validators:
+                    with timed(self.model_instance, "validate", key):
+                        if config is None:
+                            validator(self, data)
+                        else:
+                            validator(
+                                self,
+                                data,
+                                config=config,
+                                model_instance=self.model_instance,
+                            )
                 return data
 
-        return type(str("Form%s" % self.pk), (Form,), fields)
+        form_class = type(str("Form%s" % self.pk), (Form,), fields)
+        # Whether the unbound form may be rendered once and reused, see
+        # FormContent.process
+        form_class.cacheable = cacheable
+        return form_class
+
+    def submissions_after(self, cursor=None, *, since=None, until=None):
+        """
+        Return the submissions after ``cursor``, oldest first
+
+        ``cursor`` is a value returned by ``submission_cursor``. Additionally,
+        only submissions made at or after the datetime ``since`` and up to and
+        including the submission at the cursor ``until`` are returned. Raises
+        ``ValueError`` for invalid cursors.
+        """
+        submissions = self.submissions.order_by("submitted_at", "id")
+        if cursor:
+            if not (position := _parse_cursor(cursor)):
+                raise ValueError(f"Invalid cursor {cursor!r}")
+            submitted_at, pk = position
+            submissions = submissions.filter(
+                Q(submitted_at__gt=submitted_at)
+                | Q(submitted_at=submitted_at, id__gt=pk)
+            )
+        if since:
+            submissions = submissions.filter(submitted_at__gte=since)
+        if until:
+            if not (position := _parse_cursor(until)):
+                raise ValueError(f"Invalid cursor {until!r}")
+            submitted_at, pk = position
+            submissions = submissions.filter(
+                Q(submitted_at__lt=submitted_at)
+                | Q(submitted_at=submitted_at, id__lte=pk)
+            )
+        return submissions
+
+    def submission_hash(self, cleaned_data, request):
+        """
+        Return a hash identifying a submission of ``cleaned_data``
+
+        The hash covers the form, the data and a client token: The value of
+        an ``_idempotency_key`` POST parameter if sent, the client's IP
+        address otherwise.
+        """
+        token = ""
+        if request is not None:
+            token = request.POST.get("_idempotency_key") or client_ip(request)
+        payload = json.dumps(
+            [self.pk, cleaned_data, token], sort_keys=True, cls=DjangoJSONEncoder
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _idempotency_claim(self, content_hash):
+        """
+        Return the cache key and timeout for claiming a submission hash
+
+        Adding the key to the cache is atomic, so only one of several
+        concurrent identical submissions runs the actions even though they
+        cannot see each other's uncommitted submissions. The saved
+        submissions are still checked in case the key has been evicted.
+        """
+        window = int(self.config["idempotency"].get("window") or 60)
+        return f"form-designer-idem:{self.pk}:{content_hash}", window
+
+    def _duplicates(self, content_hash):
+        window = int(self.config["idempotency"].get("window") or 60)
+        return FormSubmission.objects.filter(
+            form=self,
+            content_hash=content_hash,
+            submitted_at__gte=timezone.now() - timedelta(seconds=window),
+        )
+
+    def _duplicate_result(self, duplicate):
+        cfg = dict(self.CONFIG_OPTIONS)
+        return {
+            key: duplicate if key == "save_fs" else None
+            for key in self.config
+            if "process" in cfg.get(key, {})
+        }
+
+    def is_rate_limited(self, request):
+        """
+        Return whether the submission should be rejected
+
+        Uses token buckets stored in the default cache, one per form and
+        client IP and one per form. Each bucket holds up to the configured
+        number of submissions per minute and is refilled continuously. The
+        buckets aren't updated atomically, the limits are approximate under
+        high concurrency.
+        """
+        if not (config := self.config.get("rate_limit")):
+            return False
+        buckets = [
+            (f"form-designer-rate:{self.pk}:ip:{client_ip(request)}", per_ip)
+            if (per_ip := config.get("per_ip"))
+            else None,
+            (f"form-designer-rate:{self.pk}", per_form)
+            if (per_form := config.get("per_form"))
+            else None,
+        ]
+        return not all(
+            _take_token(key, rate=rate) for key, rate in filter(None, buckets)
+        )
 
     def form(self):  # pragma: no cover
         warnings.warn("Use form_class instead", DeprecationWarning, stacklevel=2)
         return self.form_class()
 
     def process(self, form, request, **kwargs):
+        """
+        Run the configured actions and return a dict of their results
+
+        Actions are run in the order of their config keys, except for actions
+        declaring themselves ``"concurrent"``: Those run after all other
+        actions, on a thread pool if there are several of them. The caller
+        stops waiting for them after their ``"timeout"`` in seconds; their
+        result is ``None`` in this case. Concurrent actions run outside the
+        request's transaction and therefore shouldn't use the database; the
+        form's fields are loaded beforehand so that formatting submissions
+        doesn't query them.
+        """
+        if not ("idempotency" in self.config and "save_fs" in self.config):
+            return self._process(form, request, kwargs)
+
+        content_hash = self.submission_hash(form.cleaned_data, request)
+        claim, window = self._idempotency_claim(content_hash)
+        claimed = cache.add(claim, 1, window)
+        duplicate = self._duplicates(content_hash).first()
+        if duplicate or not claimed:
+            # The duplicate is None while the first submission is uncommitted
+            return self._duplicate_result(duplicate)
+        try:
+            return self._process(
+                form, request, {**kwargs, "content_hash": content_hash}
+            )
+        except BaseException:
+            # Allow resubmitting data whose processing failed
+            cache.delete(claim)
+            raise
+
+    def _process(self, form, request, kwargs):
         ret = {}
         cfg = dict(self.CONFIG_OPTIONS)
+        concurrent = []
 
         for key, config in self.config.items():
             try:
@@ -175,100 +875,509 @@ class Form(models.Model):
                 # ignore configs without process methods
                 continue
 
-            ret[key] = process(
-                model_instance=self,
-                form_instance=form,
-                request=request,
-                config=config,
+            kw = {
+                "model_instance": self,
+                "form_instance": form,
+                "request": request,
+                "config": config,
                 **kwargs,
-            )
+            }
+            if _is_concurrent(cfg[key]):
+                # Reserve the slot so that the order of results is kept
+                ret[key] = None
+                concurrent.append((key, process, kw))
+                continue
+
+            with timed(self, "process", key):
+                ret[key] = process(**kw)
+
+        if len(concurrent) == 1:
+            key, process, kw = concurrent[0]
+            with timed(self, "process", key):
+                ret[key] = process(**kw)
+        elif concurrent:
+            if self.pk is not None:
+                self._field_loaders()
+            executor = _action_executor()
+            language = get_language()
+            start = time.monotonic()
+            futures = [
+                (key, executor.submit(_run_action, key, process, language, kw))
+                for key, process, kw in concurrent
+            ]
+            for key, future in futures:
+                timeout = cfg[key].get("timeout", DEFAULT_ACTION_TIMEOUT)
+                try:
+                    ret[key] = future.result(max(0, start + timeout - time.monotonic()))
+                except FuturesTimeoutError:
+                    logger.warning(
+                        "Action %r of form %s did not finish in %ss",
+                        key,
+                        self.pk,
+                        timeout,
+                    )
 
         return ret
 
-    def submissions_data(self, *, submissions=None):
-        if submissions is None:
-            submissions = self.submissions.all()
+    async def aprocess(self, form, request, **kwargs):
+        """
+        Async variant of ``process``
+
+        Config options may provide an ``aprocess`` coroutine function, options
+        only providing ``process`` are run in a thread.
+        """
+        if not ("idempotency" in self.config and "save_fs" in self.config):
+            return await self._aprocess(form, request, kwargs)
+
+        content_hash = self.submission_hash(form.cleaned_data, request)
+        claim, window = self._idempotency_claim(content_hash)
+        claimed = await cache.aadd(claim, 1, window)
+        duplicate = await self._duplicates(content_hash).afirst()
+        if duplicate or not claimed:
+            return self._duplicate_result(duplicate)
+        try:
+            return await self._aprocess(
+                form, request, {**kwargs, "content_hash": content_hash}
+            )
+        except BaseException:
+            await cache.adelete(claim)
+            raise
 
-        def loader(submission, field, choice_dict):
-            value = None
-            if field.name in submission.data:
-                value = submission.data[field.name]
-            elif (old := field._old_name) is not None and old in submission.data:
-                value = submission.data[old]
+    async def _aprocess(self, form, request, kwargs):
+        ret = {}
+        cfg = dict(self.CONFIG_OPTIONS)
+        concurrent = []
+
+        for key, config in self.config.items():
+            options = cfg.get(key, {})
+            if "aprocess" in options:
+                aprocess = options["aprocess"]
+            elif "process" in options and _is_concurrent(options):
+                aprocess = sync_to_async(
+                    _closing_connections(options["process"]),
+                    thread_sensitive=False,
+                )
+            elif "process" in options:
+                aprocess = sync_to_async(options["process"])
+            else:
+                # ignore configs without process methods
+                continue
+
+            kw = {
+                "model_instance": self,
+                "form_instance": form,
+                "request": request,
+                "config": config,
+                **kwargs,
+            }
+            if _is_concurrent(options):
+                ret[key] = None
+                concurrent.append((key, aprocess, kw))
+                continue
+
+            with timed(self, "process", key):
+                ret[key] = await aprocess(**kw)
+
+        async def run(key, aprocess, kw):
+            timeout = cfg[key].get("timeout", DEFAULT_ACTION_TIMEOUT)
             try:
-                if isinstance(value, list):
-                    return [choice_dict.get(v, v) for v in value]
-                return choice_dict.get(value, value)
-            except TypeError:  # unhashable types or other, unexpected circumstances
-                return value
+                with timed(self, "process", key):
+                    ret[key] = await asyncio.wait_for(aprocess(**kw), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Action %r of form %s did not finish in %ss", key, self.pk, timeout
+                )
 
-        def old_name_loader(submission, old_name):
-            return submission.data.get(old_name)
+        if concurrent and self.pk is not None:
+            # Also a single synchronous action runs on a worker thread
+            await sync_to_async(self._field_loaders)()
+        if len(concurrent) == 1:
+            key, aprocess, kw = concurrent[0]
+            with timed(self, "process", key):
+                ret[key] = await aprocess(**kw)
+        elif concurrent:
+            await asyncio.gather(*(run(*action) for action in concurrent))
 
-        def include_slugified_choices(choices):
-            return dict(choices) | {slugify(value): label for value, label in choices}
+        return ret
 
-        fields_and_loaders = [
-            (
-                {"name": field.name, "title": field.title},
-                partial(
-                    loader,
-                    field=field,
-                    choice_dict=include_slugified_choices(field.get_choices()),
-                ),
-            )
-            for field in self.fields.all()
+    def bulk_create_submissions(
+        self, rows, *, url="", batch_size=500, actions=(), request=None
+    ):
+        """
+        Validate and store many submissions at once
+
+        ``rows`` is an iterable of dicts mapping field names to submitted
+        values. Valid rows are inserted using ``bulk_create`` in batches of
+        ``batch_size``. Configured actions are only run for the config keys
+        listed in ``actions`` (e.g. ``("email",)``), they receive ``request``
+        which may be ``None``.
+
+        Returns the number of created submissions and a list of
+        ``(index, errors)`` tuples for invalid rows.
+        """
+        # Load the fields once for building the form class and the summaries
+        models.prefetch_related_objects([self], "fields")
+        form_class = self.form_class()
+        cfg = dict(self.CONFIG_OPTIONS)
+        processes = [
+            (cfg[key]["process"], config)
+            for key, config in self.config.items()
+            if key in actions and key != "save_fs" and "process" in cfg.get(key, {})
         ]
-        known = {field["name"] for field, loader in fields_and_loaders}
 
-        # Construct the superset of all all submissions' data fields
-        for submission in submissions:
-            if unknown := set(submission.data) - known:
-                for old_name in unknown:
-                    fields_and_loaders.append(
-                        (
-                            {
-                                "name": old_name,
-                                "title": "{} ({})".format(
-                                    old_name, gettext("removed field")
-                                ),
-                            },
-                            partial(old_name_loader, old_name=old_name),
-                        )
-                    )
+        created = 0
+        errors = []
+        batch = []
 
-        return [
-            {
+        def flush():
+            FormSubmission.objects.bulk_create(batch)
+            keys = set()
+            for submission in batch:
+                keys.update(submission.data)
+            record_data_keys(self.pk, keys, batch[-1].submitted_at)
+            invalidate_submission_statistics(self.pk)
+            batch.clear()
+
+        for index, row in enumerate(rows):
+            form_instance = form_class(row)
+            if not form_instance.is_valid():
+                errors.append((index, form_instance.errors))
+                continue
+
+            for process, config in processes:
+                process(
+                    model_instance=self,
+                    form_instance=form_instance,
+                    request=request,
+                    config=config,
+                )
+            batch.append(
+                FormSubmission(
+                    form=self,
+                    data=form_instance.cleaned_data,
+                    url=url,
+                    summary=submission_summary(self, form_instance),
+                )
+            )
+            created += 1
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+        return created, errors
+
+    def submissions_data(self, *, submissions=None, include_archived=False):
+        return list(
+            self.iter_submissions_data(
+                submissions=submissions,
+                chunk_size=None,
+                include_archived=include_archived,
+            )
+        )
+
+    def iter_submissions_data(
+        self,
+        *,
+        submissions=None,
+        chunk_size=2000,
+        include_archived=False,
+        all_keys=False,
+    ):
+        """
+        Like ``submissions_data`` but yields the rows one by one
+
+        Querysets are fetched in chunks of ``chunk_size`` submissions so that
+        memory usage stays flat regardless of the number of submissions.
+        Submissions moved into archives are appended when ``include_archived``
+        is set, reading the archive files line by line. All keys ever
+        submitted are included when processing all submissions or when
+        ``all_keys`` is set, so that exports of subsets have the same columns.
+        """
+        keys = None
+        if submissions is None:
+            submissions = self.submissions.all()
+            all_keys = True
+        if all_keys:
+            keys = self.data_keys.values_list("key", flat=True)
+
+        archives = list(self.archives.all()) if include_archived else []
+        fields_and_loaders = self._submissions_fields_and_loaders(
+            submissions,
+            chunk_size=chunk_size,
+            keys=keys,
+            extra_keys=[key for archive in archives for key in archive.keys],
+        )
+        if chunk_size and isinstance(submissions, models.QuerySet):
+            submissions = submissions.iterator(chunk_size=chunk_size)
+        if archives:
+            submissions = itertools.chain(
+                submissions,
+                itertools.chain.from_iterable(
+                    archive.submissions() for archive in archives
+                ),
+            )
+        for submission in submissions:
+            yield {
                 "submission": submission,
                 "data": [
                     dict(field, value=loader(submission))
                     for field, loader in fields_and_loaders
                 ],
             }
-            for submission in submissions
-        ]
 
+    def _field_loaders(self):
+        """
+        Return the loaders of the form's fields
+
+        The loaders are cached on the instance (until the form's version
+        changes) so that formatting many submissions of the same form instance
+        only builds the choice dictionaries once.
+        """
+        cached = getattr(self, "_field_loaders_cache", None)
+        if cached is None or cached[0] != self.version:
+            cached = (
+                self.version,
+                [
+                    (
+                        {"name": field.name, "title": field.title},
+                        partial(
+                            _field_loader,
+                            field=field,
+                            choice_dict=field.get_choice_labels(),
+                        ),
+                    )
+                    for field in self.fields.all()
+                ],
+            )
+            self._field_loaders_cache = cached
+        return list(cached[1])
+
+    def _submissions_fields_and_loaders(
+        self, submissions, *, chunk_size=None, keys=None, extra_keys=()
+    ):
+        fields_and_loaders = self._field_loaders()
+        known = {field["name"] for field, loader in fields_and_loaders}
+
+        # Construct the superset of all all submissions' data fields
+        if keys is not None:
+            keys = set(keys)
+        elif isinstance(submissions, models.QuerySet):
+            keys = _database_data_keys(submissions)
+            if keys is None and chunk_size:
+                keys = set()
+                for data in submissions.values_list("data", flat=True).iterator(
+                    chunk_size=chunk_size
+                ):
+                    keys.update(data)
+        if keys is None:
+            keys = set()
+            for submission in submissions:
+                keys.update(submission.data)
+        keys.update(extra_keys)
+
+        fields_and_loaders.extend(
+            (
+                {
+                    "name": old_name,
+                    "title": "{} ({})".format(old_name, gettext("removed field")),
+                },
+                partial(_old_name_loader, old_name=old_name),
+            )
+            for old_name in sorted(keys - known)
+        )
+        return fields_and_loaders
+
+    def submission_statistics(self):
+        """
+        Return the number of submissions per day, the fill rate of each field
+        and the value counts of fields with choices
+
+        The statistics are computed in the database (value counts fall back to
+        Python on backends without the required JSON functions) and cached
+        until the form changes or a submission is saved. Use
+        ``invalidate_submission_statistics`` after creating submissions using
+        ``bulk_create``.
+        """
+        key = f"form-designer-statistics-{self.pk}"
+        counter = cache.get_or_set(
+            _statistics_generation_key(self.pk), time.time_ns, None
+        )
+        generation = f"{self.version}-{counter}"
+        cached = cache.get(key)
+        if cached is not None and cached["generation"] == generation:
+            return cached
+        statistics = self._compute_statistics(self.submissions.all())
+        statistics["generation"] = generation
+        cache.set(
+            key,
+            statistics,
+            getattr(settings, "FORM_DESIGNER_STATISTICS_TIMEOUT", 3600),
+        )
+        return statistics
+
+    def _compute_statistics(self, submissions):
+        fields = list(self.fields.all())
+        keys = [field.name for field in fields]
+        choice_keys = [field.name for field in fields if field._parsed_choices()]
 
-FIELD_TYPES = import_string(
-    getattr(
-        settings,
-        "FORM_DESIGNER_FIELD_TYPES",
-        "form_designer.default_field_types.FIELD_TYPES",
+        fill_counts = _database_fill_counts(submissions, keys)
+        value_counts = {
+            key: _database_value_counts(submissions, key) for key in choice_keys
+        }
+        if fill_counts is None or None in value_counts.values():
+            fill_counts, value_counts = _python_statistics(
+                submissions, keys, choice_keys
+            )
+        total, filled = fill_counts
+
+        def share(count):
+            return 100 * count / total if total else 0
+
+        statistics = {
+            "total": total,
+            "per_day": [
+                (row["day"], row["count"])
+                for row in submissions.annotate(day=TruncDate("submitted_at"))
+                .values("day")
+                .annotate(count=Count("pk"))
+                .order_by("day")
+            ],
+            "fields": [],
+        }
+        for field in fields:
+            row = {
+                "name": field.name,
+                "title": field.title,
+                "filled": filled[field.name],
+                "fill_rate": share(filled[field.name]),
+                "values": None,
+            }
+            if field.name in value_counts:
+                remaining = dict(value_counts[field.name])
+                row["values"] = []
+                for choice in field._parsed_choices():
+                    count = remaining.pop(choice["value"], 0)
+                    if choice["slug"] != choice["value"]:
+                        count += remaining.pop(choice["slug"], 0)
+                    row["values"].append((choice["label"], count, share(count)))
+                # Values which aren't choices (anymore)
+                row["values"].extend(
+                    (value, count, share(count))
+                    for value, count in sorted(
+                        remaining.items(), key=lambda item: (-item[1], item[0])
+                    )
+                )
+            statistics["fields"].append(row)
+        return statistics
+
+
+def _python_statistics(submissions, keys, choice_keys):
+    """
+    Return the same counts as ``_database_fill_counts`` and
+    ``_database_value_counts`` by inspecting the submissions in Python
+    """
+    total = 0
+    filled = dict.fromkeys(keys, 0)
+    value_counts = {key: {} for key in choice_keys}
+    for data in submissions.values_list("data", flat=True).iterator(chunk_size=2000):
+        total += 1
+        if not isinstance(data, dict):
+            continue
+        for key in keys:
+            if data.get(key) not in (None, "", []):
+                filled[key] += 1
+        for key in choice_keys:
+            value = data.get(key)
+            for item in value if isinstance(value, list) else [value]:
+                if item is not None and not isinstance(item, (dict, list)):
+                    counts = value_counts[key]
+                    counts[str(item)] = counts.get(str(item), 0) + 1
+    return (total, filled), value_counts
+
+
+def _field_loader(submission, field, choice_dict):
+    value = None
+    if field.name in submission.data:
+        value = submission.data[field.name]
+    elif (old := field._old_name) is not None and old in submission.data:
+        value = submission.data[old]
+    try:
+        if isinstance(value, list):
+            return [choice_dict.get(v, v) for v in value]
+        return choice_dict.get(value, value)
+    except TypeError:  # unhashable types or other, unexpected circumstances
+        return value
+
+
+def _old_name_loader(submission, old_name):
+    return submission.data.get(old_name)
+
+
+class FieldTypes:
+    """
+    Immutable registry of field types, built once at startup
+
+    Iterating and indexing behaves like the configured list of field type
+    dicts. ``get()`` and ``by_type`` provide constant time access by type.
+    """
+
+    def __init__(self, field_types):
+        types = []
+        for field_type in field_types:
+            if isinstance(field_type, dict):
+                types.append(MappingProxyType(dict(field_type)))
+                continue
+            warnings.warn(
+                f"Form designer field type {field_type!r} still uses the old configuration format.",
+                DeprecationWarning,
+                stacklevel=1,
+            )
+            types.append(
+                MappingProxyType(
+                    {
+                        "type": field_type[0],
+                        "verbose_name": field_type[1],
+                        "field": field_type[2],
+                    }
+                )
+            )
+
+        self._types = tuple(types)
+        by_type = {}
+        for field_type in self._types:
+            if field_type["type"] in by_type:
+                raise ImproperlyConfigured(
+                    f"Form designer field type {field_type['type']!r} is defined more than once."
+                )
+            by_type[field_type["type"]] = field_type
+        self.by_type = MappingProxyType(by_type)
+
+    def __iter__(self):
+        return iter(self._types)
+
+    def __len__(self):
+        return len(self._types)
+
+    def __getitem__(self, index):
+        return self._types[index]
+
+    def get(self, type, default=None):
+        return self.by_type.get(type, default)
+
+    def choices(self):
+        return [(type["type"], type["verbose_name"]) for type in self._types]
+
+
+FIELD_TYPES = FieldTypes(
+    import_string(
+        getattr(
+            settings,
+            "FORM_DESIGNER_FIELD_TYPES",
+            "form_designer.default_field_types.FIELD_TYPES",
+        )
     )
 )
-for index, field_type in enumerate(FIELD_TYPES[:]):
-    if isinstance(field_type, dict):
-        continue
-    warnings.warn(
-        f"Form designer field type {field_type!r} still uses the old configuration format.",
-        DeprecationWarning,
-        stacklevel=1,
-    )
-    FIELD_TYPES[index] = {
-        "type": field_type[0],
-        "verbose_name": field_type[1],
-        "field": field_type[2],
-    }
 
 
 class _StaticChoicesCharField(models.CharField):
@@ -328,10 +1437,11 @@ class FormField(models.Model):
     type = _StaticChoicesCharField(
         _("field type"),
         max_length=20,
-        choices=[(type["type"], type["verbose_name"]) for type in FIELD_TYPES],
+        choices=FIELD_TYPES.choices(),
     )
-    choices = models.CharField(
-        _("choices"), max_length=1024, blank=True, help_text=_("Comma-separated")
+    choices = models.TextField(_("choices"), blank=True, help_text=_("Comma-separated"))
+    parsed_choices = models.JSONField(
+        _("parsed choices"), default=list, blank=True, editable=False
     )
     help_text = models.CharField(
         _("help text"),
@@ -356,28 +1466,60 @@ class FormField(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.parsed_choices = self.parse_choices(self.choices)
+        if (update_fields := kwargs.get("update_fields")) is not None:
+            kwargs["update_fields"] = {*update_fields, "parsed_choices"}
+        super().save(*args, **kwargs)
+
+    save.alters_data = True
+
     def clean(self):
-        try:
-            cfg = next(type for type in FIELD_TYPES if type["type"] == self.type)
-        except StopIteration:
+        if (cfg := FIELD_TYPES.get(self.type)) is None:
             # Fine. The model will not validate anyway.
             return
 
         for fn in cfg.get("clean_field", ()):
             fn(self)
 
-    def get_choices(self):
-        def get_tuple(value):
-            return (value.strip(), value.strip())
+    @staticmethod
+    def parse_choices(choices):
+        """
+        Parse comma-separated choices into a list of dicts containing the
+        value, the label and the slugified value
+        """
+        if not choices:
+            return []
+        return [
+            {"value": value, "label": value, "slug": slugify(value)}
+            for value in (value.strip() for value in choices.split(","))
+        ]
+
+    def _parsed_choices(self):
+        # Unsaved instances and rows written without going through save()
+        # (e.g. queryset updates) may not have up to date parsed choices.
+        if self.parsed_choices or not self.choices:
+            return self.parsed_choices
+        return self.parse_choices(self.choices)
 
-        choices = [get_tuple(value) for value in self.choices.split(",")]
+    def get_choices(self):
+        choices = [
+            (choice["value"], choice["label"]) for choice in self._parsed_choices()
+        ]
         if not self.is_required and self.type == "select":
             choices = BLANK_CHOICE_DASH + choices
         return tuple(choices)
 
+    def get_choice_labels(self):
+        """
+        Return a dict mapping values and their slugified variants to labels
+        """
+        return dict(self.get_choices()) | {
+            choice["slug"]: choice["label"] for choice in self._parsed_choices()
+        }
+
     def get_type(self, **kwargs):
-        types = {type["type"]: type["field"] for type in FIELD_TYPES}
-        return types[self.type](**kwargs)
+        return FIELD_TYPES.by_type[self.type]["field"](**kwargs)
 
     def add_formfield(self, fields, form):
         fields[slugify(self.name)] = self.formfield()
@@ -395,6 +1537,83 @@ class FormField(models.Model):
         return self.get_type(**kwargs)
 
 
+# Maps form primary keys to (version, form class) tuples. Only the newest
+# version of each form is kept around. The classes do not reference form
+# instances, see Form.form_class.
+_form_class_cache = {}
+
+
+def _bump_form_version(form):
+    form.version = _new_form_version()
+    Form.objects.filter(pk=form.pk).update(version=form.version)
+
+
+@receiver(post_save, sender=FormField)
+@receiver(post_delete, sender=FormField)
+def _formfield_changed(sender, instance, **kwargs):
+    if FormField.form.is_cached(instance):
+        _bump_form_version(instance.form)
+    else:
+        _bump_form_version(Form(pk=instance.form_id))
+
+
+@receiver(post_delete, sender=Form)
+def _form_deleted(sender, instance, **kwargs):
+    _form_class_cache.pop(instance.pk, None)
+
+
+def paginate_submissions(submissions, *, cursor=None, limit=100):
+    """
+    Return a page of submissions and the cursor of the next page
+
+    Uses keyset pagination on ``(submitted_at, id)`` (newest first) instead of
+    offsets, so fetching later pages is as fast as fetching the first page.
+    The cursor is ``None`` if there are no more submissions.
+    """
+    submissions = submissions.order_by("-submitted_at", "-id")
+    if position := _parse_cursor(cursor):
+        submitted_at, pk = position
+        submissions = submissions.filter(
+            Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=pk)
+        )
+    page = list(submissions[: limit + 1])
+    if len(page) <= limit:
+        return page, None
+    return page[:limit], submission_cursor(page[limit - 1])
+
+
+def submission_cursor(submission):
+    """
+    Return an opaque cursor pointing at ``submission``
+    """
+    return f"{submission.submitted_at.isoformat()}_{submission.pk}"
+
+
+def parse_since(value):
+    """
+    Parse a date or datetime for ``Form.submissions_after(since=...)``
+
+    Dates are the start of the day, naive values are in the current time
+    zone. Raises ``ValueError`` for invalid values.
+    """
+    if (since := parse_datetime(value)) is None:
+        if (date := parse_date(value)) is None:
+            raise ValueError(_("Invalid date %r.") % value)
+        since = datetime.combine(date, datetime.min.time())
+    if settings.USE_TZ and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _parse_cursor(cursor):
+    try:
+        submitted_at, pk = cursor.rsplit("_", 1)
+        submitted_at, pk = parse_datetime(submitted_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    return (submitted_at, pk) if submitted_at else None
+
+
 class FormSubmission(models.Model):
     submitted_at = models.DateTimeField(_("submitted at"), auto_now_add=True)
     form = models.ForeignKey(
@@ -405,8 +1624,26 @@ class FormSubmission(models.Model):
     )
     data = models.JSONField(_("data"), encoder=DjangoJSONEncoder)
     url = models.CharField(_("URL"), max_length=2000)
+    summary = models.TextField(
+        _("summary"),
+        blank=True,
+        help_text=_("The formatted data at the time of submission."),
+    )
+    content_hash = models.CharField(
+        _("content hash"), max_length=64, blank=True, editable=False
+    )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["form", "submitted_at"], name="fd_submission_form_idx"
+            ),
+            models.Index(fields=["submitted_at"], name="fd_submission_date_idx"),
+            models.Index(
+                fields=["form", "content_hash", "submitted_at"],
+                name="fd_submission_hash_idx",
+            ),
+        ]
         ordering = ["-submitted_at"]
         verbose_name = _("form submission")
         verbose_name_plural = _("form submissions")
@@ -414,12 +1651,19 @@ class FormSubmission(models.Model):
     def __str__(self):
         return str(self.submitted_at)
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.summary:
+            self.summary = self.formatted_data()
+        super().save(*args, **kwargs)
+
+    save.alters_data = True
+
     def formatted_data(self, *, html=False, default="Ø"):
         sd = self.form.submissions_data(submissions=[self])
         data = (
             (
                 field["title"],
-                ", ".join(value)
+                ", ".join(map(str, value))
                 if isinstance(value := field["value"] or default, list)
                 else value,
             )
@@ -433,6 +1677,303 @@ class FormSubmission(models.Model):
         return "\n".join("{}:\n{}\n".format(*item) for item in data)
 
 
+class SubmissionArchive(models.Model):
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    form = models.ForeignKey(
+        Form,
+        verbose_name=_("form"),
+        related_name="archives",
+        on_delete=models.CASCADE,
+    )
+    file = models.FileField(_("file"), upload_to="form_designer/archives/")
+    count = models.PositiveIntegerField(_("count"))
+    first_submitted_at = models.DateTimeField(_("first submitted at"))
+    last_submitted_at = models.DateTimeField(_("last submitted at"))
+    keys = models.JSONField(_("keys"), default=list)
+
+    class Meta:
+        ordering = ["-last_submitted_at"]
+        verbose_name = _("submission archive")
+        verbose_name_plural = _("submission archives")
+
+    def __str__(self):
+        return self.file.name
+
+    def submissions(self):
+        """
+        Yield the archived submissions as unsaved ``FormSubmission`` instances
+        """
+        with self.file.open("rb") as f, gzip.open(f, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                row = json.loads(line)
+                yield FormSubmission(
+                    id=row["id"],
+                    form=self.form,
+                    submitted_at=parse_datetime(row["submitted_at"]),
+                    data=row["data"],
+                    url=row["url"],
+                )
+
+
+def archive_submissions(form, *, before, chunk_size=2000):
+    """
+    Move the form's submissions older than ``before`` into a gzipped JSONL
+    file and record it in a ``SubmissionArchive``
+
+    Returns the archive or ``None`` if there was nothing to archive.
+    """
+    submissions = form.submissions.filter(submitted_at__lt=before).order_by(
+        "-submitted_at", "-id"
+    )
+    ids = []
+    keys = set()
+    first = last = None
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for submission in submissions.iterator(chunk_size=chunk_size):
+                f.write(
+                    json.dumps(
+                        {
+                            "id": submission.id,
+                            "submitted_at": submission.submitted_at,
+                            "url": submission.url,
+                            "data": submission.data,
+                        },
+                        cls=DjangoJSONEncoder,
+                    )
+                )
+                f.write("\n")
+                ids.append(submission.id)
+                keys.update(submission.data)
+                last = last or submission.submitted_at
+                first = submission.submitted_at
+
+        if not ids:
+            return None
+
+        tmp.seek(0)
+        archive = SubmissionArchive(
+            form=form,
+            count=len(ids),
+            first_submitted_at=first,
+            last_submitted_at=last,
+            keys=sorted(keys),
+        )
+        archive.file.save(
+            f"{form.pk}-{last:%Y%m%d%H%M%S}.jsonl.gz", File(tmp), save=False
+        )
+        try:
+            with transaction.atomic():
+                archive.save()
+                for i in range(0, len(ids), chunk_size):
+                    FormSubmission.objects.filter(
+                        pk__in=ids[i : i + chunk_size]
+                    ).delete()
+        except BaseException:
+            # Do not leave an orphaned file behind
+            archive.file.delete(save=False)
+            raise
+    invalidate_submission_statistics(form.pk)
+    return archive
+
+
+@receiver(post_delete, sender=SubmissionArchive)
+def _submissionarchive_deleted(sender, instance, using, **kwargs):
+    # Only remove the file once the deletion has been committed
+    if instance.file:
+        transaction.on_commit(
+            partial(instance.file.storage.delete, instance.file.name), using=using
+        )
+
+
+class FormDataKey(models.Model):
+    form = models.ForeignKey(
+        Form,
+        verbose_name=_("form"),
+        related_name="data_keys",
+        on_delete=models.CASCADE,
+    )
+    key = models.CharField(_("key"), max_length=100)
+    first_seen_at = models.DateTimeField(_("first seen at"))
+    last_seen_at = models.DateTimeField(_("last seen at"))
+
+    class Meta:
+        ordering = ["key"]
+        unique_together = (("form", "key"),)
+        verbose_name = _("data key")
+        verbose_name_plural = _("data keys")
+
+    def __str__(self):
+        return self.key
+
+
+class ExportMarker(models.Model):
+    form = models.ForeignKey(
+        Form,
+        verbose_name=_("form"),
+        related_name="export_markers",
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("user"),
+        on_delete=models.CASCADE,
+    )
+    cursor = models.CharField(
+        _("cursor"),
+        max_length=100,
+        help_text=_("Points at the last exported submission."),
+    )
+    exported_at = models.DateTimeField(_("exported at"), auto_now=True)
+
+    class Meta:
+        unique_together = (("form", "user"),)
+        verbose_name = _("export marker")
+        verbose_name_plural = _("export markers")
+
+    def __str__(self):
+        return self.cursor
+
+
+def record_data_keys(form_id, keys, seen_at):
+    """
+    Record the keys of a submission's data in the form's key index
+
+    Unseen keys are inserted. The ``last_seen_at`` timestamp of known keys is
+    only refreshed when it is older than ``FORM_DESIGNER_DATA_KEY_REFRESH``
+    seconds (default: one hour), so that most submissions don't write to the
+    index at all and concurrent submissions don't contend for its rows.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    last_seen = dict(
+        FormDataKey.objects.filter(form_id=form_id, key__in=keys).values_list(
+            "key", "last_seen_at"
+        )
+    )
+    if unseen := keys - last_seen.keys():
+        FormDataKey.objects.bulk_create(
+            [
+                FormDataKey(
+                    form_id=form_id,
+                    key=key,
+                    first_seen_at=seen_at,
+                    last_seen_at=seen_at,
+                )
+                for key in unseen
+            ],
+            ignore_conflicts=True,
+        )
+    refresh_before = seen_at - timedelta(
+        seconds=getattr(settings, "FORM_DESIGNER_DATA_KEY_REFRESH", 3600)
+    )
+    if stale := [key for key, last in last_seen.items() if last < refresh_before]:
+        FormDataKey.objects.filter(
+            form_id=form_id, key__in=stale, last_seen_at__lt=refresh_before
+        ).update(last_seen_at=seen_at)
+
+
+def _statistics_generation_key(form_id):
+    return f"form-designer-statistics-{form_id}-generation"
+
+
+def invalidate_submission_statistics(form_id):
+    """
+    Discard the cached submission statistics of a form
+    """
+    cache.set(_statistics_generation_key(form_id), time.time_ns(), None)
+
+
+@receiver(post_save, sender=FormSubmission)
+def _formsubmission_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_submission_statistics(instance.form_id)
+    if created and isinstance(instance.data, dict):
+        record_data_keys(instance.form_id, instance.data, instance.submitted_at)
+
+
+class DigestEntry(models.Model):
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    form = models.ForeignKey(
+        Form,
+        verbose_name=_("form"),
+        related_name="digest_entries",
+        on_delete=models.CASCADE,
+    )
+    data = models.JSONField(_("data"), encoder=DjangoJSONEncoder)
+    url = models.CharField(_("URL"), max_length=2000)
+    claimed_until = models.DateTimeField(
+        _("claimed until"),
+        null=True,
+        blank=True,
+        help_text=_("Set while the entry is being sent."),
+    )
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = _("digest entry")
+        verbose_name_plural = _("digest entries")
+
+    def __str__(self):
+        return str(self.created_at)
+
+
+class OutboxMail(models.Model):
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    subject = models.CharField(_("subject"), max_length=200)
+    body = models.TextField(_("body"))
+    to = models.JSONField(_("to"))
+    cc = models.JSONField(_("cc"), default=list)
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    next_attempt_at = models.DateTimeField(
+        _("next attempt at"),
+        default=timezone.now,
+        null=True,
+        db_index=True,
+        help_text=_("Empty if sending the mail has been given up."),
+    )
+    last_error = models.TextField(_("last error"), blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = _("outbox mail")
+        verbose_name_plural = _("outbox mails")
+
+    def __str__(self):
+        return self.subject
+
+
+class WebhookDelivery(models.Model):
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    form = models.ForeignKey(
+        Form,
+        on_delete=models.CASCADE,
+        related_name="webhook_deliveries",
+        verbose_name=_("form"),
+    )
+    url = models.URLField(_("URL"), max_length=1000)
+    headers = models.JSONField(_("headers"), default=dict)
+    body = models.TextField(_("body"))
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    next_attempt_at = models.DateTimeField(
+        _("next attempt at"),
+        default=timezone.now,
+        null=True,
+        db_index=True,
+        help_text=_("Empty if delivering the request has been given up."),
+    )
+    last_error = models.TextField(_("last error"), blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = _("webhook delivery")
+        verbose_name_plural = _("webhook deliveries")
+
+    def __str__(self):
+        return self.url
+
+
 if apps.is_installed("mosparo_django"):
     from mosparo_django.fields import MosparoField
 
@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+
+from django.dispatch import Signal
+
+
+# Sent with the ``Form`` class as sender after each step of building and
+# processing a form. Arguments are ``form`` (the ``Form`` instance), ``step``
+# (``"form_class"``, ``"is_valid"``, ``"validate"`` or ``"process"``), ``key``
+# (the config key for validators and actions, ``None`` otherwise) and
+# ``duration`` in seconds.
+form_step_timed = Signal(use_caching=True)
+
+
+@contextmanager
+def timed(form, step, key=None):
+    """
+    Measure the duration of the block and send ``form_step_timed``
+
+    The signal is also sent when the block raises an exception, for example
+    when a validator rejects the submission.
+    """
+    if not form_step_timed.has_listeners(type(form)):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        form_step_timed.send(
+            sender=type(form),
+            form=form,
+            step=step,
+            key=key,
+            duration=time.perf_counter() - start,
+        )
@@ -0,0 +1,277 @@
+"""
+Benchmarks for the form lifecycle
+
+Runs against the test project using a fresh test database::
+
+    python tests/manage.py benchmark_form_designer --output before.json
+    # ... change things ...
+    python tests/manage.py benchmark_form_designer --compare before.json
+
+Use ``--sizes 10000 100000 1000000`` to benchmark ``submissions_data`` and the
+exports with more submissions.
+"""
+
+import datetime as dt
+import itertools
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import deque
+from functools import partial
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from form_designer import models
+from form_designer.models import Form, FormField, FormSubmission, record_data_keys
+
+
+FIELD_TYPES = [
+    ("text", ""),
+    ("email", ""),
+    ("longtext", ""),
+    ("select", "One,Two,Three"),
+    ("multiple-select", "Choice A,Choice B,Choice C"),
+    ("checkbox", ""),
+    ("date", ""),
+]
+
+PROCESS_CONFIGS = [
+    ("save_fs", {}),
+    ("email", {"email": "info@example.com"}),
+    ("email_digest", {"email": "info@example.com", "interval": 60}),
+]
+
+
+def make_form(field_count, *, config=None, title="Benchmark form"):
+    form = Form.objects.create(title=title, config=config or {})
+    types = itertools.cycle(FIELD_TYPES)
+    FormField.objects.bulk_create(
+        [
+            FormField(
+                form=form,
+                ordering=i,
+                title=f"Field {i}",
+                name=f"field-{i}",
+                type=type,
+                choices=choices,
+                parsed_choices=FormField.parse_choices(choices),
+                is_required=type != "checkbox",
+            )
+            for i, (type, choices) in zip(range(field_count), types)
+        ]
+    )
+    # bulk_create skips the signal handler changing the version
+    form.save()
+    return Form.objects.prefetch_related("fields").get(pk=form.pk)
+
+
+def make_data(form, i):
+    data = {}
+    for field in form.fields.all():
+        if field.type == "email":
+            data[field.name] = f"user{i}@example.com"
+        elif field.type == "select":
+            data[field.name] = ["One", "Two", "Three"][i % 3]
+        elif field.type == "multiple-select":
+            data[field.name] = ["Choice A", "Choice C"][: i % 3 or 1]
+        elif field.type == "checkbox":
+            data[field.name] = bool(i % 2)
+        elif field.type == "date":
+            data[field.name] = f"2024-01-{i % 28 + 1:02d}"
+        else:
+            data[field.name] = f"Value {i} of {field.name}"
+    return data
+
+
+def make_submissions(form, count, *, batch_size=5000):
+    now = timezone.now()
+    for start in range(0, count, batch_size):
+        FormSubmission.objects.bulk_create(
+            [
+                FormSubmission(
+                    form=form,
+                    data=make_data(form, i),
+                    url="/benchmark/",
+                    submitted_at=now - dt.timedelta(seconds=count - i),
+                )
+                for i in range(start, min(start + batch_size, count))
+            ]
+        )
+    record_data_keys(form.pk, [field.name for field in form.fields.all()], now)
+
+
+def consume(response):
+    if response.streaming:
+        return b"".join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = "Benchmark form building, processing, exports and the admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fields",
+            type=int,
+            nargs="+",
+            default=[5, 50, 500],
+            help="Field counts for building form classes.",
+        )
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10000],
+            help="Submission counts for submissions_data and the exports.",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--compare", help="Compare with the results stored in this JSON file."
+        )
+
+    def handle(self, **options):
+        self.repeat = options["repeat"]
+        self.results = []
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                self.bench_form_class(options["fields"])
+                self.bench_process()
+                self.bench_submissions(options["sizes"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = {
+            "meta": {
+                "date": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "fields": options["fields"],
+                "sizes": options["sizes"],
+                "repeat": self.repeat,
+            },
+            "results": self.results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(output, f, indent=2)
+        if options["compare"]:
+            self.compare(options["compare"])
+
+    def measure(self, name, fn, *, memory=False, setup=None):
+        """
+        Call ``fn`` repeatedly and record the timings in seconds
+
+        ``setup`` runs before each call and isn't timed. The peak memory
+        allocated during the first call is recorded if ``memory`` is set.
+        """
+        result = {"name": name}
+        timings = []
+        for i in range(self.repeat):
+            if setup is not None:
+                setup()
+            if trace := memory and i == 0:
+                tracemalloc.start()
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+            if trace:
+                result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        result |= {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.mean(timings),
+            "max": max(timings),
+        }
+        self.results.append(result)
+
+        line = f"{name:<40} {result['median'] * 1000:>10.2f} ms"
+        if "peak_memory" in result:
+            line += f" {result['peak_memory'] / 2**20:>10.1f} MiB peak"
+        self.stdout.write(line)
+
+    def bench_form_class(self, field_counts):
+        for field_count in field_counts:
+            form = make_form(field_count)
+            self.measure(
+                f"form_class[{field_count} fields]",
+                form.form_class,
+                setup=models._form_class_cache.clear,
+            )
+            self.measure(f"form_class[{field_count} fields, cached]", form.form_class)
+
+    def bench_process(self):
+        request = RequestFactory().post("/")
+        for key, config in PROCESS_CONFIGS:
+            form = make_form(10, config={key: config}, title=f"Process {key}")
+            form_instance = form.form_class()(
+                {name: value for name, value in make_data(form, 1).items() if value}
+            )
+            form_instance.is_valid()
+            self.measure(
+                f"process[{key}]", partial(form.process, form_instance, request)
+            )
+
+    def bench_submissions(self, sizes):
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        client = Client()
+        client.login(username="admin", password="password")
+
+        for size in sizes:
+            form = make_form(10, title=f"Submissions {size}")
+            make_submissions(form, size)
+
+            self.measure(
+                f"submissions_data[{size}]", form.submissions_data, memory=True
+            )
+            self.measure(
+                f"iter_submissions_data[{size}]",
+                lambda form=form: deque(form.iter_submissions_data(), maxlen=0),
+                memory=True,
+            )
+            export = f"/admin/form_designer/form/{form.pk}/export_submissions/"
+            self.measure(
+                f"export_xlsx[{size}]",
+                lambda url=export: consume(client.get(url)),
+                memory=True,
+            )
+            self.measure(
+                f"export_csv[{size}]",
+                lambda url=export: consume(client.get(url, {"format": "csv"})),
+                memory=True,
+            )
+            self.measure(
+                f"changelist[{size}]",
+                lambda form=form: consume(
+                    client.get(
+                        "/admin/form_designer/formsubmission/",
+                        {"form__id__exact": form.pk},
+                    )
+                ),
+            )
+
+    def compare(self, path):
+        with open(path) as f:
+            baseline = {row["name"]: row for row in json.load(f)["results"]}
+        self.stdout.write(f"\nCompared to {path}:")
+        for row in self.results:
+            if (old := baseline.get(row["name"])) is None:
+                continue
+            self.stdout.write(
+                f"{row['name']:<40} {old['median'] * 1000:>10.2f} ms"
+                f" -> {row['median'] * 1000:>10.2f} ms"
+                f" ({row['median'] / old['median'] - 1:+.1%})"
+            )
@@ -1,10 +1,51 @@
+import html
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
+
+import django
+from asgiref.sync import async_to_sync
 from django import forms
+from django.contrib import admin
 from django.contrib.auth.models import User
 from django.core import mail
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from feincms.module.page.models import Page
 
-from form_designer.models import FIELD_TYPES, Form, FormSubmission
+from form_designer import exports, models
+from form_designer.admin import FormAdmin, FormSubmissionAdmin
+from form_designer.contents import CSRF_TOKEN_PLACEHOLDER
+from form_designer.delivery import WebhookConnectionPool, send_webhooks
+from form_designer.models import (
+    FIELD_TYPES,
+    FieldTypes,
+    Form,
+    FormDataKey,
+    FormField,
+    FormSubmission,
+    OutboxMail,
+    SubmissionArchive,
+    WebhookDelivery,
+    archive_submissions,
+    paginate_submissions,
+    record_data_keys,
+    validate_webhook_payload,
+)
+from form_designer.signals import form_step_timed
 
 
 def validate_honeypot(form, data, **kwargs):
@@ -204,6 +245,18 @@ class FormsTest(TestCase):
             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
 
+        response = self.client.get(
+            f"/admin/form_designer/form/{submission.form_id}/export_submissions/?format=csv"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-type"], "text/csv; charset=utf-8")
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(rows[0].startswith("Subject,Email,Body,"))
+        self.assertTrue(rows[1].startswith("subject,email,body,"))
+        self.assertTrue(rows[2].startswith("Test,valid@example.com,Hello World,"))
+
         response = self.client.get(
             f"/admin/form_designer/formsubmission/{submission.id}/change/"
         )
@@ -369,6 +422,32 @@ class FormsTest(TestCase):
             ],
         )
 
+        self.assertEqual(
+            list(form.iter_submissions_data(chunk_size=1)), form.submissions_data()
+        )
+
+        # The keys of removed fields are determined by the database, the
+        # field loaders are cached on the form instance
+        with self.assertNumQueries(2):  # Data keys and submissions
+            form.submissions_data(submissions=form.submissions.all())
+        self.assertEqual(
+            [
+                field["name"]
+                for field in form.submissions_data(
+                    submissions=form.submissions.filter(pk=s1.pk)
+                )[0]["data"]
+            ],
+            ["subject", "email", "test"],
+        )
+        self.assertEqual(form.submissions_data(submissions=form.submissions.none()), [])
+
+        # Removed fields only appear once
+        FormSubmission.objects.create(form=form, data={"e mail": "b@example.com"})
+        self.assertEqual(
+            [field["name"] for field in form.submissions_data()[0]["data"]],
+            ["subject", "email", "test", "e mail"],
+        )
+
     def test_email_to_author(self):
         form = Form.objects.create(
             title="Test contact form",
@@ -439,3 +518,1301 @@ class FormsTest(TestCase):
             },
         )
         self.assertIn("Multiple Choice:\nChoice A, Choice C", s2.formatted_data())
+
+    def test_parsed_choices(self):
+        form = Form.objects.create(title="Test contact form")
+        field = form.fields.create(
+            ordering=0,
+            title="Country",
+            name="country",
+            type="select",
+            choices=",".join(f"Country {i}" for i in range(200)),
+        )
+
+        # No length limit anymore
+        self.assertGreater(len(field.choices), 1024)
+        field.refresh_from_db()
+        self.assertEqual(len(field.parsed_choices), 200)
+        self.assertEqual(
+            field.parsed_choices[0],
+            {"value": "Country 0", "label": "Country 0", "slug": "country-0"},
+        )
+        self.assertEqual(field.get_choices()[1], ("Country 1", "Country 1"))
+        self.assertEqual(field.get_choice_labels()["country-1"], "Country 1")
+
+        field.choices = "A, B"
+        field.save(update_fields=["choices"])
+        field.refresh_from_db()
+        self.assertEqual(field.get_choices(), (("A", "A"), ("B", "B")))
+
+        # Rows updated without save() fall back to parsing on the fly
+        FormField.objects.filter(pk=field.pk).update(choices="C", parsed_choices=[])
+        field.refresh_from_db()
+        self.assertEqual(field.get_choices(), (("C", "C"),))
+
+        field.is_required = False
+        self.assertEqual(field.get_choices(), (("", "---------"), ("C", "C")))
+
+        text = form.fields.create(ordering=1, title="Text", name="text", type="text")
+        self.assertEqual(text.parsed_choices, [])
+        self.assertEqual(text.get_choices(), ())
+
+    def test_form_class_cache(self):
+        form = Form.objects.create(title="Cached form")
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        form_class = form.form_class()
+        with self.assertNumQueries(0):
+            self.assertIs(form.form_class(), form_class)
+
+        # Other instances of the same form version share the fields and
+        # validators but get their own model_instance
+        other = Form.objects.get(pk=form.pk)
+        with self.assertNumQueries(0):
+            other_class = other.form_class()
+        self.assertIsNot(other_class, form_class)
+        self.assertIs(other_class.__bases__[0], form_class.__bases__[0])
+        self.assertIs(other_class.model_instance, other)
+        self.assertIs(form_class.model_instance, form)
+
+        # Instances loaded before the form changed do not replace the cached
+        # class of the newer version
+        stale = Form.objects.get(pk=form.pk)
+        form.fields.create(ordering=1, title="Email", name="email", type="email")
+        self.assertEqual(list(form.form_class().base_fields), ["subject", "email"])
+        stale.form_class()
+        form = Form.objects.get(pk=form.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(form.form_class().base_fields), ["subject", "email"])
+        FormField.objects.filter(name="email").delete()
+
+        # Adding fields invalidates the cache, also for fresh instances
+        form.fields.create(ordering=1, title="Email", name="email", type="email")
+        self.assertEqual(list(form.form_class().base_fields), ["subject", "email"])
+        form = Form.objects.get(pk=form.pk)
+        self.assertEqual(list(form.form_class().base_fields), ["subject", "email"])
+
+        # Changing and deleting fields without a cached form does as well
+        field = FormField.objects.get(name="subject")
+        field.title = "Topic"
+        field.save()
+        form = Form.objects.get(pk=form.pk)
+        self.assertEqual(form.form_class().base_fields["subject"].label, "Topic")
+
+        field.delete()
+        form = Form.objects.get(pk=form.pk)
+        self.assertEqual(list(form.form_class().base_fields), ["email"])
+
+        # Saving the form itself (e.g. changed config) invalidates the cache
+        form_class = form.form_class()
+        form.config = {"honeypot": {}}
+        form.save()
+        self.assertIsNot(form.form_class(), form_class)
+
+    def test_field_types(self):
+        self.assertEqual(FIELD_TYPES.get("email")["field"], forms.EmailField)
+        self.assertIsNone(FIELD_TYPES.get("unknown"))
+        self.assertEqual(FIELD_TYPES[0], FIELD_TYPES.by_type["text"])
+        self.assertEqual(FIELD_TYPES.choices()[0], ("text", "text"))
+
+        with self.assertWarns(DeprecationWarning):
+            types = FieldTypes([("text", "Text", forms.CharField)])
+        self.assertEqual(
+            dict(types.get("text")),
+            {"type": "text", "verbose_name": "Text", "field": forms.CharField},
+        )
+
+        with self.assertRaises(TypeError):
+            types.by_type["email"] = {}
+
+        with self.assertRaises(ImproperlyConfigured):
+            FieldTypes(
+                [
+                    {"type": "text", "verbose_name": "A", "field": forms.CharField},
+                    {"type": "text", "verbose_name": "B", "field": forms.CharField},
+                ]
+            )
+
+    def test_prepare_forms(self):
+        page = Page.objects.create(override_url="/", title="")
+        for i in range(3):
+            form = Form.objects.create(title=f"Form {i}")
+            form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+            page.formcontent_set.create(region="main", ordering=i, form=form)
+
+        content_type = page.formcontent_set.model
+        models._form_class_cache.clear()
+
+        # Contents, forms and fields
+        with self.assertNumQueries(3):
+            contents = content_type.prepare_forms(content_type.objects.all())
+        with self.assertNumQueries(0):
+            for content in contents:
+                self.assertEqual(len(content.form.fields.all()), 1)
+
+        response = self.client.get("/")
+        self.assertContains(response, 'method="post"', 3)
+
+        # Form classes are cached, so fields are neither prefetched nor loaded
+        with self.assertNumQueries(2):
+            content_type.prepare_forms(content_type.objects.all())
+
+        # Page, content counts and contents with their forms and parents
+        with self.assertNumQueries(3):
+            response = self.client.get("/")
+        self.assertContains(response, 'method="post"', 3)
+        page.formcontent_set.create(
+            region="main", ordering=3, form=Form.objects.get(title="Form 0")
+        )
+        with self.assertNumQueries(3):
+            self.client.get("/")
+
+    @override_settings(FORM_DESIGNER_FORM_CACHE_TIMEOUT=60)
+    def test_unbound_form_cache(self):
+        cache.clear()
+        form = Form.objects.create(title="Cached form")
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        page = Page.objects.create(override_url="/", title="")
+        content = page.formcontent_set.create(region="main", ordering=0, form=form)
+
+        factory = RequestFactory()
+        content.process(factory.get("/"))
+        first = content.render()
+        self.assertIn('name="fc%d-subject"' % content.id, first)
+        self.assertNotIn(CSRF_TOKEN_PLACEHOLDER, first)
+
+        with mock.patch("form_designer.contents.render_to_string") as render:
+            content.process(factory.get("/"))
+        render.assert_not_called()
+        second = content.render()
+        self.assertNotIn(CSRF_TOKEN_PLACEHOLDER, second)
+        self.assertIn('name="csrfmiddlewaretoken"', second)
+        # Every request gets its own token
+        self.assertNotEqual(first, second)
+
+        # Changing the form invalidates the cached HTML
+        form.title = "Changed form"
+        form.save()
+        content.process(factory.get("/"))
+        self.assertIn("Changed form", content.render())
+
+        # Bound forms are never cached
+        content.process(factory.post("/", {}))
+        self.assertIn("This field is required", content.render())
+
+    def test_step_timing(self):
+        form = Form.objects.create(
+            title="Timed form", config={"honeypot": {}, "save_fs": {}}
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        form.fields.create(
+            ordering=1,
+            title="Honeypot",
+            name="honeypot",
+            type="text",
+            is_required=False,
+        )
+        page = Page.objects.create(override_url="/", title="")
+        content = page.formcontent_set.create(region="main", ordering=0, form=form)
+
+        steps = []
+
+        instances = set()
+
+        def receiver(sender, form, step, key, duration, **kwargs):
+            self.assertGreaterEqual(duration, 0)
+            steps.append((form.pk, step, key))
+            instances.add(id(form))
+
+        form_step_timed.connect(receiver, sender=Form)
+        self.addCleanup(form_step_timed.disconnect, receiver, sender=Form)
+
+        factory = RequestFactory()
+        content.process(factory.post("/", {f"fc{content.id}-subject": "Hello"}))
+        self.assertEqual(
+            steps,
+            [
+                (form.pk, "form_class", None),
+                (form.pk, "validate", "honeypot"),
+                (form.pk, "is_valid", None),
+                (form.pk, "process", "save_fs"),
+            ],
+        )
+
+        # Steps are reported for the instance processing the request even
+        # though the form class is cached
+        steps.clear()
+        instances.clear()
+        content = page.formcontent_set.get()
+        content.process(factory.post("/", {f"fc{content.id}-subject": "Hello"}))
+        self.assertEqual(instances, {id(content.form)})
+        self.assertEqual(
+            steps,
+            [
+                (form.pk, "validate", "honeypot"),
+                (form.pk, "is_valid", None),
+                (form.pk, "process", "save_fs"),
+            ],
+        )
+
+        # Steps are also reported when validation fails
+        steps.clear()
+        content.process(
+            factory.post(
+                "/",
+                {f"fc{content.id}-subject": "Hello", f"fc{content.id}-honeypot": "1"},
+            )
+        )
+        self.assertEqual(
+            steps,
+            [(form.pk, "validate", "honeypot"), (form.pk, "is_valid", None)],
+        )
+
+    def test_data_keys(self):
+        form = Form.objects.create(title="Test form", config={"save_fs": {}})
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        s1 = FormSubmission.objects.create(form=form, data={"subject": "a", "old": 1})
+
+        def data_keys():
+            return [
+                (key.key, key.first_seen_at, key.last_seen_at)
+                for key in form.data_keys.all()
+            ]
+
+        # Known keys are only refreshed after FORM_DESIGNER_DATA_KEY_REFRESH
+        with self.assertNumQueries(1):
+            record_data_keys(form.pk, ["subject"], s1.submitted_at)
+        s2 = FormSubmission.objects.create(form=form, data={"subject": "b"})
+        self.assertEqual(
+            data_keys(),
+            [
+                ("old", s1.submitted_at, s1.submitted_at),
+                ("subject", s1.submitted_at, s1.submitted_at),
+            ],
+        )
+        form.data_keys.update(last_seen_at=s1.submitted_at - timedelta(hours=2))
+        record_data_keys(form.pk, ["subject"], s2.submitted_at)
+        self.assertEqual(data_keys()[1], ("subject", s1.submitted_at, s2.submitted_at))
+
+        # The key index is used when exporting all submissions
+        FormDataKey.objects.filter(key="old").delete()
+        self.assertEqual(
+            [field["name"] for field in form.submissions_data()[0]["data"]],
+            ["subject"],
+        )
+        FormSubmission.objects.create(form=form, data={"old": 2})
+        self.assertEqual(
+            [field["name"] for field in form.submissions_data()[0]["data"]],
+            ["subject", "old"],
+        )
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get(f"/admin/form_designer/form/{form.id}/change/")
+        self.assertContains(response, "<td>subject</td>")
+        self.assertContains(response, "<td>old (removed field)</td>")
+
+    @override_settings(FORM_DESIGNER_EMAIL_OUTBOX=True)
+    def test_email_outbox(self):
+        form = Form.objects.create(
+            title="Test contact form",
+            config={"email": {"email": "info@example.com"}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        page = Page.objects.create(override_url="/", title="")
+        page.formcontent_set.create(region="main", ordering=0, form=form)
+
+        for subject in ["One", "Two"]:
+            response = self.client.post(
+                "/",
+                {"_formcontent": form.id, f"fc{form.id}-subject": subject},
+            )
+            self.assertContains(response, "Thank you, your input has been received.")
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxMail.objects.count(), 2)
+
+        results = [None, OSError("Connection refused")]
+
+        def send(*args, **kwargs):
+            # The batch has been claimed before sending
+            self.assertFalse(
+                OutboxMail.objects.filter(next_attempt_at__lte=timezone.now())
+            )
+            if isinstance(result := results.pop(0), Exception):
+                raise result
+
+        with mock.patch("form_designer.delivery.EmailMessage.send", side_effect=send):
+            call_command("send_form_designer_mails", stdout=io.StringIO())
+
+        failed = OutboxMail.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("Connection refused", failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+
+        # Not due yet
+        call_command("send_form_designer_mails", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+
+        OutboxMail.objects.update(next_attempt_at=timezone.now())
+        call_command("send_form_designer_mails", stdout=io.StringIO())
+        self.assertEqual(OutboxMail.objects.count(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["info@example.com"])
+        self.assertIn("Subject:\nTwo\n", mail.outbox[0].body)
+
+    @override_settings(
+        EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+        EMAIL_HOST="127.0.0.1",
+        EMAIL_PORT=1,
+        EMAIL_TIMEOUT=1,
+    )
+    def test_email_outbox_unreachable(self):
+        OutboxMail.objects.create(subject="Hello", body="World", to=["a@example.com"])
+
+        with self.assertLogs("form_designer.delivery", "WARNING"):
+            call_command("send_form_designer_mails", interval=0, stdout=io.StringIO())
+
+        failed = OutboxMail.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+
+    def test_webhook(self):
+        requests = []
+        statuses = [500, 200, 200]
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                requests.append((self.client_address, self.path, self.headers, body))
+                self.send_response(statuses.pop(0))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/hook/?token=1"
+
+        form = Form.objects.create(
+            title="Webhook form",
+            config={"webhook": {"url": url, "headers": "X-Secret: 42"}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        page = Page.objects.create(override_url="/", title="")
+        page.formcontent_set.create(region="main", ordering=0, form=form)
+
+        for subject in ["One", "Two"]:
+            response = self.client.post(
+                "/", {"_formcontent": form.id, f"fc{form.id}-subject": subject}
+            )
+            self.assertContains(response, "Thank you, your input has been received.")
+
+        # Nothing is sent while processing the submission
+        self.assertEqual(requests, [])
+        self.assertEqual(form.webhook_deliveries.count(), 2)
+
+        call_command("send_form_designer_webhooks", stdout=io.StringIO())
+        self.assertEqual(len(requests), 2)
+        # Both requests used the same connection
+        self.assertEqual(requests[0][0], requests[1][0])
+        self.assertEqual(requests[0][1], "/hook/?token=1")
+        self.assertEqual(requests[0][2]["X-Secret"], "42")
+        self.assertEqual(requests[0][2]["Content-Type"], "application/json")
+        self.assertEqual(
+            json.loads(requests[1][3]),
+            {
+                "form": {"id": form.id, "title": "Webhook form"},
+                "url": "http://testserver/",
+                "data": {"subject": "Two"},
+            },
+        )
+
+        failed = form.webhook_deliveries.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("HTTP status 500", failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+
+        form.webhook_deliveries.update(next_attempt_at=timezone.now())
+        call_command("send_form_designer_webhooks", stdout=io.StringIO())
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(form.webhook_deliveries.count(), 0)
+
+        # Payload templates
+        form.config["webhook"]["payload"] = '{"text": "{{ data.subject }}"}'
+        form.save()
+        self.client.post(
+            "/", {"_formcontent": form.id, f"fc{form.id}-subject": "<Three>"}
+        )
+        self.assertEqual(form.webhook_deliveries.get().body, '{"text": "<Three>"}')
+
+        # Deliveries are claimed before sending
+        claimed = []
+
+        def post(url, body, headers):
+            claimed.append(
+                WebhookDelivery.objects.get().next_attempt_at > timezone.now()
+            )
+            return 200
+
+        with mock.patch.object(WebhookConnectionPool, "post", side_effect=post):
+            send_webhooks()
+        self.assertEqual(claimed, [True])
+
+        with self.assertRaisesMessage(forms.ValidationError, "Invalid template"):
+            validate_webhook_payload("{% if %}")
+
+    def test_idempotency(self):
+        cache.clear()
+        form = Form.objects.create(
+            title="Idempotent form",
+            config={
+                "save_fs": {},
+                "email": {"email": "info@example.com"},
+                "idempotency": {"window": 60},
+            },
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        page = Page.objects.create(override_url="/", title="")
+        page.formcontent_set.create(
+            region="main", ordering=0, form=form, success_message="Thanks"
+        )
+
+        data = {"_formcontent": form.id, f"fc{form.id}-subject": "Hello"}
+        for _i in range(2):
+            response = self.client.post("/", data)
+            self.assertContains(response, "Thanks")
+        self.assertEqual(form.submissions.count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Different data or client tokens are new submissions
+        self.client.post("/", {**data, f"fc{form.id}-subject": "Other"})
+        self.client.post("/", {**data, "_idempotency_key": "tab-2"})
+        self.assertEqual(form.submissions.count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+        # Repeating the submission after the window is fine
+        form.submissions.update(submitted_at=timezone.now() - timedelta(seconds=61))
+        cache.clear()  # The claims expire after the window as well
+        with self.assertNumQueries(1):
+            self.assertIsNone(
+                form._duplicates(
+                    form.submission_hash(
+                        {"subject": "Hello"}, RequestFactory().post("/")
+                    )
+                ).first()
+            )
+        self.client.post("/", data)
+        self.assertEqual(form.submissions.count(), 4)
+
+    def test_idempotency_concurrent(self):
+        cache.clear()
+        form = Form.objects.create(
+            title="Idempotent form",
+            config={"first": {}, "save_fs": {}, "idempotency": {"window": 60}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        form_instance = form.form_class()({"subject": "Hello"})
+        self.assertTrue(form_instance.is_valid())
+        request = RequestFactory().post("/")
+        results = []
+
+        def first(**kwargs):
+            if not results:
+                # A concurrent request with the same data runs before the
+                # submission of this one has been saved
+                results.append(form.process(form_instance, request))
+            elif len(results) == 1:
+                raise OSError("Failed")
+
+        config_options = [
+            *Form.CONFIG_OPTIONS,
+            ("first", {"title": "First", "process": first}),
+        ]
+        with mock.patch.object(Form, "CONFIG_OPTIONS", config_options):
+            result = form.process(form_instance, request)
+            self.assertEqual(results, [{"first": None, "save_fs": None}])
+            self.assertEqual(result["save_fs"], form.submissions.get())
+
+            # Failed submissions may be repeated immediately
+            form.submissions.all().delete()
+            cache.clear()
+            with self.assertRaises(OSError):
+                form.process(form_instance, request)
+            self.assertFalse(form.submissions.exists())
+            results.append(None)
+            form.process(form_instance, request)
+            self.assertEqual(form.submissions.count(), 1)
+
+            # The async variant claims the submission as well
+            self.assertEqual(
+                async_to_sync(form.aprocess)(form_instance, request)["save_fs"],
+                form.submissions.get(),
+            )
+
+    def test_idempotency_requires_save_fs(self):
+        form_class = FormAdmin(Form, admin.site).get_form(None)
+        data = {
+            "title": "Idempotent form",
+            "initial-config": "{}",
+            "config": "{}",
+            "_is_active_idempotency": "on",
+            "idempotency_window": "60",
+        }
+        form = form_class(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            "Ignore repeated submissions requires Save form submission.",
+            form.non_field_errors(),
+        )
+        self.assertTrue(form_class(data | {"_is_active_save_fs": "on"}).is_valid())
+
+    def test_rate_limit(self):
+        cache.clear()
+        form = Form.objects.create(
+            title="Limited form",
+            config={"save_fs": {}, "rate_limit": {"per_ip": 2, "per_form": 3}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        page = Page.objects.create(override_url="/", title="")
+        content = page.formcontent_set.create(
+            region="main", ordering=0, form=form, success_message="Thanks"
+        )
+
+        factory = RequestFactory()
+
+        def submit(ip):
+            request = factory.post(
+                "/", {f"fc{content.id}-subject": "Spam"}, REMOTE_ADDR=ip
+            )
+            content.process(request)
+            return content.render()
+
+        self.assertIn("Thanks", submit("10.0.0.1"))
+        self.assertIn("Thanks", submit("10.0.0.1"))
+        with mock.patch.object(Form, "form_class") as form_class:
+            self.assertIn("Too many submissions", submit("10.0.0.1"))
+        # Rejected before building the form
+        form_class.assert_not_called()
+
+        # Another client may still submit until the form's limit is reached
+        self.assertIn("Thanks", submit("10.0.0.2"))
+        self.assertIn("Too many submissions", submit("10.0.0.3"))
+        self.assertEqual(form.submissions.count(), 3)
+
+        # Buckets are refilled over time
+        with mock.patch(
+            "form_designer.models.time.time", return_value=time.time() + 60
+        ):
+            self.assertIn("Thanks", submit("10.0.0.1"))
+
+        # Displaying the form isn't limited
+        content.process(factory.get("/", REMOTE_ADDR="10.0.0.1"))
+        self.assertIn('method="post"', content.render())
+
+    def test_email_digest(self):
+        form = Form.objects.create(
+            title="Test digest form",
+            config={"email_digest": {"email": "a@example.com, b@example.com"}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        page = Page.objects.create(override_url="/", title="")
+        page.formcontent_set.create(region="main", ordering=0, form=form)
+
+        for subject in ["One", "Two", "Three"]:
+            self.client.post(
+                "/",
+                {"_formcontent": form.id, f"fc{form.id}-subject": subject},
+            )
+
+        self.assertEqual(form.digest_entries.count(), 3)
+
+        # The interval has not passed yet
+        call_command("send_form_designer_digests", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+
+        form.digest_entries.update(created_at=timezone.now() - timedelta(hours=2))
+        # Savepoint, entries, forms, fields, claim, release, delete
+        with self.assertNumQueries(7):
+            call_command("send_form_designer_digests", stdout=io.StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ["a@example.com", "b@example.com"])
+        self.assertEqual(message.subject, "Test digest form: 3 submissions")
+        self.assertIn("Subject:\nOne\n", message.body)
+        self.assertIn("Subject:\nThree\n", message.body)
+        self.assertEqual(form.digest_entries.count(), 0)
+
+    def test_email_digest_recipients(self):
+        forms = [
+            Form.objects.create(
+                title=title,
+                config={"email_digest": {"email": "a@example.com", "interval": 60}},
+            )
+            for title in ["First", "Second"]
+        ]
+        other = Form.objects.create(
+            title="Other", config={"email_digest": {"email": "b@example.com"}}
+        )
+        for form in [*forms, other]:
+            form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+            form.digest_entries.create(data={"subject": form.title}, url="/")
+
+        # One digest per recipient list, sent once any entry is due
+        forms[0].digest_entries.update(created_at=timezone.now() - timedelta(hours=2))
+        overlapping = []
+
+        def send(message):
+            # Overlapping runs skip the claimed entries
+            overlapping.append(models.DigestEntry.objects.count())
+            with mock.patch.object(mail.EmailMessage, "send") as nested_send:
+                call_command("send_form_designer_digests", stdout=io.StringIO())
+            nested_send.assert_not_called()
+            return 1
+
+        with mock.patch.object(
+            mail.EmailMessage, "send", autospec=True, side_effect=send
+        ):
+            call_command("send_form_designer_digests", stdout=io.StringIO())
+
+        self.assertEqual(overlapping, [3])
+        self.assertEqual(
+            list(models.DigestEntry.objects.values_list("form", flat=True)),
+            [other.pk],
+        )
+
+        # Failed digests are sent again once the claim expires
+        other.digest_entries.update(created_at=timezone.now() - timedelta(hours=2))
+        with (
+            mock.patch.object(mail.EmailMessage, "send", side_effect=OSError),
+            self.assertLogs("form_designer.delivery", "WARNING"),
+        ):
+            call_command("send_form_designer_digests", stdout=io.StringIO())
+        call_command("send_form_designer_digests", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+
+        models.DigestEntry.objects.update(claimed_until=timezone.now())
+        call_command("send_form_designer_digests", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Other: 1 submission")
+        self.assertFalse(models.DigestEntry.objects.exists())
+
+    def test_bulk_create_submissions(self):
+        form = Form.objects.create(
+            title="Import form",
+            config={"email": {"email": "info@example.com"}, "save_fs": {}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        form.fields.create(
+            ordering=1,
+            title="Multiple Choice",
+            name="multiple-choice",
+            type="multiple-select",
+            choices="A,B,C",
+            is_required=False,
+        )
+
+        with self.assertNumQueries(4):  # Fields, insert, data keys (update, insert)
+            created, errors = form.bulk_create_submissions(
+                [
+                    {"subject": "One", "multiple-choice": ["A", "C"]},
+                    {"multiple-choice": ["A"]},
+                    {"subject": "Three"},
+                ],
+                url="import",
+            )
+        self.assertEqual(created, 2)
+        self.assertEqual([index for index, _errors in errors], [1])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            set(form.data_keys.values_list("key", flat=True)),
+            {"subject", "multiple-choice"},
+        )
+
+        form.bulk_create_submissions([{"subject": "Four"}], actions=["email"])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(form.submissions.count(), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl = os.path.join(directory, "submissions.jsonl")
+            with open(jsonl, "w") as f:
+                f.write('{"subject": "Five"}\n\n{"subject": ""}\n')
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command(
+                "import_form_submissions", form.pk, jsonl, stdout=stdout, stderr=stderr
+            )
+            self.assertIn("Imported 1 submissions, skipped 1", stdout.getvalue())
+            self.assertIn("Row 2:", stderr.getvalue())
+
+            csv = os.path.join(directory, "submissions.csv")
+            with open(csv, "w") as f:
+                f.write('subject,multiple-choice\nSix,"A, B"\n')
+            call_command(
+                "import_form_submissions", form.pk, csv, "--batch-size=1", stdout=stdout
+            )
+
+        self.assertEqual(
+            form.submissions.order_by("-pk")[0].data,
+            {"subject": "Six", "multiple-choice": ["A", "B"]},
+        )
+        self.assertEqual(form.submissions.count(), 5)
+
+    @skipIf(django.VERSION < (4, 1), "The async ORM requires Django 4.1")
+    def test_aprocess(self):
+        form = Form.objects.create(
+            title="Async form",
+            config={"save_fs": {}, "email": {"email": "info@example.com"}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        page = Page.objects.create(override_url="/", title="")
+        content = page.formcontent_set.create(
+            region="main", ordering=0, form=form, success_message="Thanks"
+        )
+        content = type(content).objects.get(pk=content.pk)
+
+        factory = RequestFactory()
+        async_to_sync(content.aprocess)(factory.get("/"))
+        self.assertIn('method="post"', content.render())
+
+        async_to_sync(content.aprocess)(
+            factory.post("/", {f"fc{content.id}-subject": "Async"})
+        )
+        self.assertIn("Thanks", content.render())
+
+        submission = FormSubmission.objects.get()
+        self.assertEqual(submission.data, {"subject": "Async"})
+        self.assertEqual(submission.url, "http://testserver/")
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_concurrent_actions(self):
+        # Both actions have to wait at the barrier at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(model_instance, config, **kwargs):
+            barrier.wait()
+            return config["name"]
+
+        def slow(**kwargs):
+            time.sleep(0.5)
+            return "slow"
+
+        config_options = [
+            *Form.CONFIG_OPTIONS,
+            ("first", {"title": "First", "process": meet, "concurrent": True}),
+            ("second", {"title": "Second", "process": meet, "concurrent": True}),
+            (
+                "slow",
+                {"title": "Slow", "process": slow, "concurrent": True, "timeout": 0.1},
+            ),
+        ]
+        form = Form(
+            title="Concurrent",
+            config={
+                "first": {"name": "first"},
+                "slow": {},
+                "honeypot": {},
+                "second": {"name": "second"},
+            },
+        )
+        with mock.patch.object(Form, "CONFIG_OPTIONS", config_options):
+            with self.assertLogs("form_designer.models", "WARNING") as logs:
+                result = form.process(forms.Form({}), None)
+            self.assertEqual(
+                result, {"first": "first", "slow": None, "second": "second"}
+            )
+            self.assertEqual(list(result), ["first", "slow", "second"])
+            self.assertIn("'slow'", logs.output[0])
+
+            barrier.reset()
+            with self.assertLogs("form_designer.models", "WARNING"):
+                result = async_to_sync(form.aprocess)(forms.Form({}), None)
+            self.assertEqual(
+                result, {"first": "first", "slow": None, "second": "second"}
+            )
+
+    def test_concurrent_email(self):
+        form = Form.objects.create(
+            title="Concurrent email",
+            config={"email": {"email": "info@example.com"}, "second": {}},
+        )
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        form = Form.objects.get(pk=form.pk)
+        form_instance = form.form_class()({"subject": "Hello"})
+        form_instance.is_valid()
+
+        threads = []
+
+        def second(**kwargs):
+            threads.append(threading.current_thread())
+
+        config_options = [
+            *Form.CONFIG_OPTIONS,
+            ("second", {"title": "Second", "process": second, "concurrent": True}),
+        ]
+        with mock.patch.object(Form, "CONFIG_OPTIONS", config_options):
+            # Fields are loaded before running concurrent actions
+            with self.assertNumQueries(1):
+                form.process(form_instance, None)
+            self.assertEqual(len(mail.outbox), 1)
+            self.assertIn("Subject:\nHello", mail.outbox[0].body)
+            self.assertNotEqual(threads[-1], threading.current_thread())
+
+            # Outbox mails are created in the request's thread and transaction
+            created_in = []
+            with (
+                override_settings(FORM_DESIGNER_EMAIL_OUTBOX=True),
+                mock.patch.object(
+                    OutboxMail.objects,
+                    "create",
+                    side_effect=lambda **kw: created_in.append(
+                        threading.current_thread()
+                    ),
+                ),
+            ):
+                form.process(form_instance, None)
+            self.assertEqual(created_in, [threading.current_thread()])
+
+        # A single synchronous concurrent action runs on a worker thread in
+        # aprocess, the fields are loaded beforehand there as well
+        queries = []
+
+        def single(model_instance, **kwargs):
+            with CaptureQueriesContext(connection) as context:
+                model_instance._field_loaders()
+            queries.append(len(context))
+
+        config_options = [
+            *Form.CONFIG_OPTIONS,
+            ("single", {"title": "Single", "process": single, "concurrent": True}),
+        ]
+        form = Form.objects.get(pk=form.pk)
+        form.config = {"single": {}}
+        with mock.patch.object(Form, "CONFIG_OPTIONS", config_options):
+            async_to_sync(form.aprocess)(form_instance, None)
+        self.assertEqual(queries, [0])
+
+    def test_archive_submissions(self):
+        form = Form.objects.create(title="Archived form", config={"save_fs": {}})
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        for subject in ["One", "Two"]:
+            FormSubmission.objects.create(
+                form=form, data={"subject": subject, "old": 1}, url="/"
+            )
+        form.submissions.update(submitted_at=timezone.now() - timedelta(days=400))
+        FormSubmission.objects.create(form=form, data={"subject": "Three"}, url="/")
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            override_settings(MEDIA_ROOT=directory),
+        ):
+            stdout = io.StringIO()
+            call_command("archive_form_submissions", "--days=365", stdout=stdout)
+            self.assertIn("Archived 2 submissions", stdout.getvalue())
+
+            archive = SubmissionArchive.objects.get()
+            self.assertEqual(archive.count, 2)
+            self.assertEqual(archive.keys, ["old", "subject"])
+            self.assertEqual(
+                [field["value"] for field in form.submissions_data()[0]["data"]],
+                ["Three", None],
+            )
+
+            sd = list(form.iter_submissions_data(include_archived=True))
+            self.assertEqual(
+                [[field["value"] for field in row["data"]] for row in sd],
+                [["Three", None], ["Two", 1], ["One", 1]],
+            )
+            self.assertEqual(
+                form.submissions_data(include_archived=True)[1]["submission"].url,
+                "/",
+            )
+
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+            self.client.login(username="admin", password="pw")
+            response = self.client.get(
+                f"/admin/form_designer/form/{form.id}/export_submissions/?format=csv&archived=1"
+            )
+            rows = b"".join(response.streaming_content).decode().splitlines()
+            self.assertEqual(len(rows), 5)
+
+            # Nothing left to archive
+            call_command("archive_form_submissions", "--before=2000-01-01")
+            self.assertEqual(SubmissionArchive.objects.count(), 1)
+
+            # Archive files are removed together with their archives
+            path = archive.file.path
+            self.assertTrue(os.path.exists(path))
+            with self.captureOnCommitCallbacks(execute=True):
+                form.delete()
+            self.assertFalse(os.path.exists(path))
+
+            # Failing to delete the archived submissions removes the file
+            form = Form.objects.create(title="Archived form")
+            FormSubmission.objects.create(form=form, data={"subject": "Four"})
+            with (
+                mock.patch.object(
+                    FormSubmission.objects, "filter", side_effect=RuntimeError
+                ),
+                self.assertRaises(RuntimeError),
+            ):
+                archive_submissions(form, before=timezone.now() + timedelta(days=1))
+            self.assertEqual(SubmissionArchive.objects.count(), 0)
+            self.assertEqual(os.listdir(os.path.dirname(path)), [])
+
+    def test_incremental_export(self):
+        form = Form.objects.create(title="Export form", config={"save_fs": {}})
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        for subject in ["One", "Two"]:
+            FormSubmission.objects.create(form=form, data={"subject": subject})
+        form.submissions.update(submitted_at=timezone.now() - timedelta(days=2))
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        url = f"/admin/form_designer/form/{form.id}/export_submissions/"
+
+        def exported(response):
+            return [
+                row.split(",")[0]
+                for row in b"".join(response.streaming_content)
+                .decode()
+                .splitlines()[2:]
+            ]
+
+        # The marker is only advanced once the whole export has been sent
+        for export_format in ["xlsx", "csv"]:
+            response = self.client.get(url, {"new": 1, "format": export_format})
+            self.assertTrue(response.streaming)
+            response.close()
+        self.assertFalse(form.export_markers.exists())
+
+        response = self.client.get(url, {"new": 1, "format": "csv"})
+        self.assertEqual(exported(response), ["One", "Two"])
+        cursor = response["X-Export-Cursor"]
+        self.assertEqual(form.export_markers.get().cursor, cursor)
+
+        response = self.client.get(url, {"new": 1, "format": "csv"})
+        self.assertRedirects(response, f"/admin/form_designer/form/{form.id}/change/")
+
+        FormSubmission.objects.create(form=form, data={"subject": "Three"})
+        response = self.client.get(url, {"new": 1, "format": "csv"})
+        self.assertEqual(exported(response), ["Three"])
+
+        # Explicit cursors and dates
+        response = self.client.get(url, {"cursor": cursor, "format": "csv"})
+        self.assertEqual(exported(response), ["Three"])
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(url, {"since": since, "format": "csv"})
+        self.assertEqual(exported(response), ["Three"])
+
+        response = self.client.get(url, {"cursor": "invalid"}, follow=True)
+        self.assertContains(response, "Invalid cursor")
+
+        # Removed fields are still exported as columns
+        form.fields.all().delete()
+        response = self.client.get(url, {"cursor": cursor, "format": "csv"})
+        self.assertEqual(exported(response), ["Three"])
+
+    @skipIf(not exports.is_available(), "Columnar exports require pyarrow")
+    def test_columnar_export(self):
+        pa = importlib.import_module("pyarrow")
+        pq = importlib.import_module("pyarrow.parquet")
+
+        form = Form.objects.create(title="Typed form")
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+        form.fields.create(ordering=1, title="Agree", name="agree", type="checkbox")
+        form.fields.create(ordering=2, title="Date", name="date", type="date")
+        form.fields.create(
+            ordering=3,
+            title="Colors",
+            name="colors",
+            type="multiple-select",
+            choices="Red,Blue",
+        )
+        FormSubmission.objects.create(
+            form=form,
+            data={
+                "subject": "Hello",
+                "agree": True,
+                "date": "2024-05-01",
+                "colors": ["Red", "Blue"],
+            },
+        )
+        # Removed and incomplete fields
+        FormSubmission.objects.create(form=form, data={"subject": "Old", "gone": 3})
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        url = f"/admin/form_designer/form/{form.id}/export_submissions/"
+
+        response = self.client.get(url, {"format": "parquet"})
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="typed-form.parquet"'
+        )
+        table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(table.schema.field("agree").type, pa.bool_())
+        self.assertEqual(table.schema.field("date").type, pa.date32())
+        self.assertEqual(table.schema.field("colors").type, pa.list_(pa.string()))
+        self.assertEqual(table.schema.field("gone").type, pa.string())
+        self.assertEqual(table.column("subject").to_pylist(), ["Old", "Hello"])
+        self.assertEqual(table.column("agree").to_pylist(), [None, True])
+        self.assertEqual(table.column("colors").to_pylist(), [None, ["Red", "Blue"]])
+        self.assertEqual(table.column("gone").to_pylist(), ["3", None])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.arrow")
+            call_command(
+                "export_form_submissions",
+                str(form.pk),
+                path,
+                format="arrow",
+                row_group_size=1,
+                stdout=io.StringIO(),
+            )
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                self.assertEqual(reader.num_record_batches, 2)
+                table = reader.read_all()
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.schema.field("subject").metadata, {b"title": b"Subject"})
+
+        # --cursor takes an export cursor, --since a date like ?since=
+        first = form.submissions.order_by("submitted_at", "id").first()
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.parquet")
+            for options, rows in [
+                ({"cursor": models.submission_cursor(first)}, 1),
+                ({"since": timezone.localdate().isoformat()}, 2),
+                ({"since": tomorrow}, 0),
+            ]:
+                call_command(
+                    "export_form_submissions",
+                    str(form.pk),
+                    path,
+                    stdout=io.StringIO(),
+                    **options,
+                )
+                self.assertEqual(pq.read_table(path).num_rows, rows)
+            with self.assertRaisesMessage(CommandError, "Invalid date"):
+                call_command(
+                    "export_form_submissions", str(form.pk), path, since="yesterday"
+                )
+
+        change_url = f"/admin/form_designer/form/{form.id}/change/"
+        self.assertContains(self.client.get(change_url), "?format=parquet")
+        with mock.patch.object(exports, "is_available", return_value=False):
+            response = self.client.get(url, {"format": "arrow"}, follow=True)
+            self.assertContains(response, "Columnar exports require pyarrow.")
+            self.assertNotContains(self.client.get(change_url), "?format=parquet")
+
+    def test_submission_statistics(self):
+        form = Form.objects.create(title="Survey")
+        form.fields.create(ordering=0, title="Name", name="name", type="text")
+        form.fields.create(
+            ordering=1,
+            title="Color",
+            name="color",
+            type="select",
+            choices="Light Red,Blue",
+        )
+        form.fields.create(
+            ordering=2,
+            title="Pets",
+            name="pets",
+            type="multiple-select",
+            choices="Cat,Dog",
+        )
+        for data in [
+            {"name": "A", "color": "Blue", "pets": ["Cat", "Dog"]},
+            {"name": "", "color": "light-red", "pets": ["Cat"]},
+            {"name": "C", "color": "Green", "pets": []},
+            {"color": "Blue"},
+        ]:
+            FormSubmission.objects.create(form=form, data=data)
+
+        def summary(statistics):
+            return {
+                field["name"]: (
+                    field["filled"],
+                    field["values"]
+                    and {label: count for label, count, share in field["values"]},
+                )
+                for field in statistics["fields"]
+            }
+
+        expected = {
+            "name": (2, None),
+            "color": (4, {"Light Red": 1, "Blue": 2, "Green": 1}),
+            "pets": (2, {"Cat": 2, "Dog": 1}),
+        }
+        cache.clear()
+        statistics = form.submission_statistics()
+        self.assertEqual(statistics["total"], 4)
+        self.assertEqual(statistics["fields"][0]["fill_rate"], 50)
+        self.assertEqual(statistics["per_day"], [(timezone.localdate(), 4)])
+        self.assertEqual(summary(statistics), expected)
+
+        with mock.patch(
+            "form_designer.models._database_fill_counts", return_value=None
+        ):
+            self.assertEqual(
+                summary(form._compute_statistics(form.submissions.all())), expected
+            )
+
+        # Cached until the next submission
+        with self.assertNumQueries(0):
+            form.submission_statistics()
+        FormSubmission.objects.create(form=form, data={"color": "Blue"})
+        self.assertEqual(form.submission_statistics()["total"], 5)
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get(f"/admin/form_designer/form/{form.id}/statistics/")
+        self.assertContains(response, "5 submissions")
+
+        self.assertContains(
+            response, "<td>Light Red</td><td>1 (20.0%)</td>", html=False
+        )
+
+        # Staff users need the permission to view forms
+        User.objects.create_user(
+            "staff", "staff@example.com", "password", is_staff=True
+        )
+        self.client.login(username="staff", password="password")
+        response = self.client.get(f"/admin/form_designer/form/{form.id}/statistics/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_keyset_pagination(self):
+        form = Form.objects.create(title="Paginated form")
+        now = timezone.now()
+        for i in range(5):
+            submission = FormSubmission.objects.create(form=form, data={"i": i})
+            # Two submissions share their timestamp
+            FormSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=now - timedelta(minutes=min(i, 3))
+            )
+
+        pages = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                page, cursor = paginate_submissions(
+                    form.submissions.all(), cursor=cursor, limit=2
+                )
+            pages.append([submission.data["i"] for submission in page])
+            if not cursor:
+                break
+        self.assertEqual(pages, [[0, 1], [2, 4], [3]])
+
+        page, cursor = paginate_submissions(form.submissions.all(), cursor="invalid")
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(cursor)
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+
+        with mock.patch.object(FormSubmissionAdmin, "list_per_page", 2):
+            response = self.client.get("/admin/form_designer/formsubmission/")
+            self.assertContains(response, "Next page")
+            self.assertNotContains(response, "First page")
+            next_url = re.search(
+                r'href="\?(cursor=[^"]+)">Next page', response.content.decode()
+            )
+
+            response = self.client.get(
+                "/admin/form_designer/formsubmission/?" + html.unescape(next_url[1])
+            )
+            self.assertEqual(
+                [row.data["i"] for row in response.context["cl"].result_list], [2, 4]
+            )
+            self.assertContains(response, "First page")
+
+            # All submissions are neither counted nor shown at once
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get("/admin/form_designer/formsubmission/?all=")
+            self.assertFalse([q for q in queries if "COUNT(" in q["sql"]])
+            self.assertEqual(len(response.context["cl"].result_list), 2)
+            self.assertNotContains(response, "5 form submissions")
+
+            # Other orderings fall back to regular pagination
+            response = self.client.get("/admin/form_designer/formsubmission/?o=3")
+            self.assertNotContains(response, "Next page")
+
+    def test_submission_changelist_queries(self):
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get("/admin/form_designer/formsubmission/")
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        forms = [Form.objects.create(title=f"Form {i}") for i in range(2)]
+        for form in forms:
+            form.fields.create(
+                ordering=0,
+                title="Choice",
+                name="choice",
+                type="select",
+                choices="A,B",
+            )
+            FormSubmission.objects.create(form=form, data={"choice": "A"})
+
+        queries = changelist_queries()
+
+        for form in forms:
+            for _i in range(10):
+                FormSubmission.objects.create(form=form, data={"choice": "b"})
+
+        self.assertEqual(changelist_queries(), queries)
+        response = self.client.get("/admin/form_designer/formsubmission/")
+        self.assertContains(response, "Choice:\nB", 20)
+
+    def test_submission_summary(self):
+        form = Form.objects.create(title="Summary form")
+        form.fields.create(ordering=0, title="Subject", name="subject", type="text")
+
+        submission = FormSubmission.objects.create(form=form, data={"subject": "Hi"})
+        self.assertEqual(submission.summary, "Subject:\nHi\n")
+
+        FormSubmission.objects.create(form=form, data={"subject": "Other"})
+        FormSubmission.objects.update(summary="")
+        form.fields.update(title="Topic")
+
+        call_command("update_form_submission_summaries", stdout=io.StringIO())
+        submission.refresh_from_db()
+        self.assertEqual(submission.summary, "Topic:\nHi\n")
+
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get("/admin/form_designer/formsubmission/?q=hi")
+        self.assertEqual(list(response.context["cl"].result_list), [submission])
+
+        # Processing formats the data once for the summary and the mail body
+        form.config = {"save_fs": {}, "email": {"email": "info@example.com"}}
+        form.save()
+        form_instance = form.form_class()({"subject": "Hello"})
+        self.assertTrue(form_instance.is_valid())
+        with mock.patch.object(
+            FormSubmission,
+            "formatted_data",
+            autospec=True,
+            side_effect=FormSubmission.formatted_data,
+        ) as formatted_data:
+            form.process(form_instance, RequestFactory().post("/"))
+        self.assertEqual(formatted_data.call_count, 1)
+        self.assertEqual(mail.outbox[0].body, "Topic:\nHello\n")
+        self.assertEqual(form.submissions.latest("pk").summary, "Topic:\nHello\n")